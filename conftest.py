@@ -0,0 +1,41 @@
+"""
+pytest support.
+
+The suite in store/tests.py runs with ``python manage.py test``. Plain pytest
+(no pytest-django) picks up ``*_test.py`` modules instead, with these
+fixtures:
+
+* ``test_database``: creates the test database once per session;
+* ``query_budget``: ``store.testing.query_budget``, used the same way::
+
+    def test_categories(test_database, query_budget):
+        with query_budget(1):
+            list(Category.objects.all())
+"""
+import os
+
+import django
+import pytest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+from store import testing  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def test_database():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    yield
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
+
+
+@pytest.fixture
+def query_budget():
+    """Fail when the wrapped code exceeds its budget or shows an N+1"""
+    return testing.query_budget
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_asgi_application()
+
+# Compile templates before the first request (WARM_TEMPLATES_ON_STARTUP)
+from store.warmup import warm_up  # noqa: E402
+
+warm_up()
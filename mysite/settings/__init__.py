@@ -0,0 +1,14 @@
+"""
+Settings profiles.
+
+``DJANGO_ENV`` picks the profile when DJANGO_SETTINGS_MODULE is the default
+``mysite.settings``: ``prod`` loads mysite.settings.prod, anything else
+(including unset) loads mysite.settings.dev. Either module can also be named
+directly in DJANGO_SETTINGS_MODULE.
+"""
+import os
+
+if os.environ.get('DJANGO_ENV', 'dev') == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    from .dev import *  # noqa: F401,F403
@@ -0,0 +1,255 @@
+"""
+Django settings for mysite project, shared by every profile.
+
+Generated by 'django-admin startproject' using Django 5.2.6. The dev and prod
+profiles in this package build on it; see mysite/settings/__init__.py.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.2/ref/settings/
+"""
+
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'django-insecure-d-3+%n3n1l-d+rem8bh(@p3g%6n+h!4!$-v(02ff3lcp$4j^t4'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'store',
+]
+
+MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'store.metrics.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    # Above everything that sets cookies: responses pass through middleware
+    # bottom-up, so it sees the session, CSRF, messages and cart cookies
+    'store.middleware.HttpCacheMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'store.middleware.CartMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'mysite.urls'
+
+# Template context processors
+TEMPLATES = [
+    {
+        # Django's backend, timing renders for store.metrics
+        'BACKEND': 'store.metrics.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'store.context_processors.cart_count',  # Add this
+            ],
+        },
+    },
+]
+
+# Cache (local memory works out of the box; switch to the file-based backend
+# to share cached catalog fragments between worker processes)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yourstore',
+    }
+}
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#         'LOCATION': BASE_DIR / 'cache',
+#     }
+# }
+
+# Seconds cached featured products and rendered catalog fragments live; any
+# product or category change invalidates them immediately
+CATALOG_CACHE_TIMEOUT = 300
+
+# Related products shown on the detail page, and how candidates are scored
+# (dotted path to ranker -> weight, see store.related)
+RELATED_PRODUCTS_LIMIT = 4
+# RELATED_PRODUCT_RANKERS = {
+#     'store.related.rank_category': 3.0,
+#     'store.related.rank_brand': 2.0,
+#     'store.related.rank_co_purchase': 2.0,
+#     'store.related.rank_featured': 0.5,
+# }
+# Seconds a product found to have nothing related is not re-scored on view
+RELATED_PRODUCTS_EMPTY_TIMEOUT = 3600
+
+# Co-purchase neighbours kept per product by build_recommendations
+CO_PURCHASE_NEIGHBOURS = 50
+
+# Seconds the cart summary stored with the cart is trusted by the header
+# badge before it is revalidated against stock
+CART_SUMMARY_TTL = 300
+
+# Anonymous carts live in a signed cookie (store.cart.CookieCart) so browsing
+# never creates a session; larger carts than this many bytes fall back to the
+# session. Logged-in users' carts are Cart/CartItem rows.
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_MAX_SIZE = 3500
+
+# Product search backend; defaults to SQLite FTS5 or PostgreSQL full-text
+# search depending on the database
+# STORE_SEARCH_BACKEND = 'store.search.SQLiteFTS5Backend'
+
+# Sales tax: default rate plus optional overrides keyed by category slug
+STORE_TAX_RATE = '0.08'
+STORE_TAX_RATES_BY_CATEGORY = {}
+
+# Product listing pagination: from this page number onwards the "Next" link
+# switches to keyset cursors, and filtered totals are cached for this long
+PRODUCT_LIST_CURSOR_AFTER_PAGE = 5
+PRODUCT_COUNT_CACHE_TIMEOUT = 60
+
+# Seconds shared caches and browsers may reuse an anonymous catalog page
+# without revalidating it (store.httpcache)
+HTTP_CACHE_MAX_AGE = 60
+
+# Per-view metrics (store.metrics): requests slower than this many seconds
+# are logged as JSON to the store.metrics logger, and /metrics only answers
+# these addresses
+SLOW_REQUEST_THRESHOLD = 1.0
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# JSON catalog API (store.api): default and maximum ?per_page
+API_PAGE_SIZE = 24
+API_MAX_PAGE_SIZE = 100
+
+# Email settings (for order confirmations)
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # Use console for development
+# For production, use SMTP:
+# EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# EMAIL_HOST = 'smtp.gmail.com'
+# EMAIL_PORT = 587
+# EMAIL_USE_TLS = True
+# EMAIL_HOST_USER = 'your-email@gmail.com'
+# EMAIL_HOST_PASSWORD = 'your-app-password'
+
+# Default from email
+DEFAULT_FROM_EMAIL = 'noreply@yourstore.com'
+
+# Outbox delivery (manage.py send_outbound_emails): attempts before an email
+# is marked failed, the base retry delay in seconds (doubles per attempt), and
+# how long a worker's claim on a batch lasts before another worker may retry it
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BACKOFF = 30
+OUTBOX_CLAIM_TIMEOUT = 300
+
+# Login/Logout URLs
+LOGIN_URL = '/accounts/login/'
+LOGIN_REDIRECT_URL = '/'
+LOGOUT_REDIRECT_URL = '/'
+
+WSGI_APPLICATION = 'mysite.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {
+            # A file rather than memory, so the threaded checkout tests see
+            # SQLite's real locking between connections
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
+
+STATIC_URL = 'static/'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# The prod profile swaps in store.storage.MinifiedManifestStaticFilesStorage
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Media files (for product images)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Responsive product image variants (store.images): widths generated as WebP
+# and JPEG, and the size of the background process pool. Set
+# PRODUCT_IMAGE_ASYNC = False to render inline instead.
+PRODUCT_IMAGE_WIDTHS = [160, 320, 640, 1024]
+PRODUCT_IMAGE_WORKERS = 2
+PRODUCT_IMAGE_ASYNC = True
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""
+Development settings: debug on, SQLite with Django's defaults, database
+sessions, and static/media served by runserver.
+"""
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+ALLOWED_HOSTS = []
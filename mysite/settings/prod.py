@@ -0,0 +1,99 @@
+"""
+Production settings.
+
+Selected with ``DJANGO_ENV=prod`` (or
+``DJANGO_SETTINGS_MODULE=mysite.settings.prod``) and configured through the
+environment:
+
+    DJANGO_SECRET_KEY  required; startup fails without it
+    DJANGO_ALLOWED_HOSTS (comma separated)
+    POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT
+        use PostgreSQL instead of the bundled SQLite database
+    SQLITE_PATH        SQLite database file (default: db.sqlite3)
+    DJANGO_SESSION_ENGINE
+        cached_db (default) or signed_cookies
+
+Static and media files are not served by Django here: run ``collectstatic``
+and let the web server serve STATIC_ROOT at STATIC_URL and MEDIA_ROOT at
+MEDIA_URL (hashed static names can be cached forever).
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, STORAGES
+
+DEBUG = False
+
+# Never fall back to the development key committed in base.py
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('DJANGO_SECRET_KEY must be set in production')
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost').split(',') if host]
+
+# Database: connections are kept open between requests instead of being
+# reopened for every one
+if os.environ.get('POSTGRES_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['POSTGRES_DB'],
+            'USER': os.environ.get('POSTGRES_USER', ''),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', ''),
+            'PORT': os.environ.get('POSTGRES_PORT', ''),
+            'CONN_MAX_AGE': 60,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    # WAL, mmap, a larger page cache and BEGIN IMMEDIATE with retry (see
+    # mysite/db/sqlite3/base.py); `timeout` is the busy timeout in seconds
+    DATABASES = {
+        'default': {
+            'ENGINE': 'mysite.db.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': None,
+            'OPTIONS': {
+                'timeout': 20,
+            },
+        }
+    }
+
+# Sessions: cached_db reads from the cache and falls back to the database;
+# signed_cookies keeps them out of the database entirely (4KB limit)
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('DJANGO_SESSION_ENGINE', 'cached_db')
+
+# Templates are read and compiled once per worker and kept in memory.
+# Explicit loaders require APP_DIRS to be off.
+TEMPLATES = [
+    {
+        # Django's backend, timing renders for store.metrics
+        'BACKEND': 'store.metrics.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'store.context_processors.cart_count',
+            ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+# Compile every store template when a worker starts (see store.warmup)
+WARM_TEMPLATES_ON_STARTUP = True
+
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {'BACKEND': 'store.storage.MinifiedManifestStaticFilesStorage'},
+}
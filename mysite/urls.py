@@ -8,7 +8,8 @@ urlpatterns = [
     path('', include('store.urls')),
 ]
 
-# Serve static and media files in development
+# Serve static and media files in development; in production the web server
+# serves STATIC_ROOT and MEDIA_ROOT (see mysite/settings/prod.py)
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_wsgi_application()
+
+# Compile templates before the first request (WARM_TEMPLATES_ON_STARTUP)
+from store.warmup import warm_up  # noqa: E402
+
+warm_up()
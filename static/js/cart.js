@@ -0,0 +1,328 @@
+// Cart page; cartData and getCookie come from script.js
+
+function updateQuantity(productId, newQuantity) {
+    if (newQuantity < 1) {
+        if (confirm('Remove this item from cart?')) {
+            removeFromCart(productId);
+        }
+        return;
+    }
+
+    // Show loading state
+    const row = document.querySelector(`[data-product-id="${productId}"]`);
+    if (!row) return;
+
+    const quantitySpan = row.querySelector('.cart-item-quantity span');
+    const originalQuantity = parseInt(quantitySpan.textContent);
+    const decrementBtn = row.querySelector('.decrement');
+    const incrementBtn = row.querySelector('.increment');
+    const priceElement = row.querySelector('.cart-item-price');
+    const unitPrice = parseFloat(row.dataset.unitPrice);
+
+    // Update UI immediately for better UX
+    quantitySpan.textContent = newQuantity;
+    decrementBtn.disabled = true;
+    incrementBtn.disabled = true;
+
+    // Update price display
+    const newSubtotal = unitPrice * newQuantity;
+    priceElement.textContent = newSubtotal.toFixed(2).replace(/\B(?=(\d{3})+(?!\d))/g, ',');
+
+    // AJAX request
+    fetch(`/update-cart/${productId}/`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'X-CSRFToken': getCookie('csrftoken'),
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: `quantity=${newQuantity}`
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'success') {
+            // Update global cart data
+            cartData.count = data.cart_count;
+            cartData.items = data.cart_items;
+
+            // Update cart badge
+            updateCartBadge();
+
+            // Update summary
+            updateCartSummary();
+
+            showNotification(`Updated quantity to ${newQuantity}`, 'success');
+        } else {
+            // Revert changes on error
+            quantitySpan.textContent = originalQuantity;
+            priceElement.textContent = (unitPrice * originalQuantity).toFixed(2).replace(/\B(?=(\d{3})+(?!\d))/g, ',');
+            showNotification(data.message || 'Failed to update quantity', 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        // Revert on network error
+        quantitySpan.textContent = originalQuantity;
+        priceElement.textContent = (unitPrice * originalQuantity).toFixed(2).replace(/\B(?=(\d{3})+(?!\d))/g, ',');
+        showNotification('Network error. Please try again.', 'error');
+    })
+    .finally(() => {
+        decrementBtn.disabled = newQuantity <= 1;
+        incrementBtn.disabled = false;
+    });
+}
+
+function removeFromCart(productId) {
+    if (!confirm('Are you sure you want to remove this item?')) return;
+
+    const row = document.querySelector(`[data-product-id="${productId}"]`);
+    if (!row) return;
+
+    // Show loading
+    row.style.opacity = '0.5';
+
+    fetch(`/remove-from-cart/${productId}/`, {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken'),
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'success') {
+            // Remove row
+            row.style.transition = 'opacity 0.3s ease';
+            row.style.opacity = '0';
+            setTimeout(() => {
+                row.remove();
+                checkEmptyCart();
+            }, 300);
+
+            // Update cart data
+            cartData.count = data.cart_count;
+            cartData.items = data.cart_items;
+
+            updateCartBadge();
+            updateCartSummary();
+
+            showNotification('Item removed from cart', 'success');
+        } else {
+            row.style.opacity = '1';
+            showNotification(data.message || 'Failed to remove item', 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        row.style.opacity = '1';
+        showNotification('Failed to remove item', 'error');
+    });
+}
+
+function clearCart() {
+    if (!confirm('Are you sure you want to clear all items from your cart?')) return;
+
+    fetch('/clear-cart/', {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken'),
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'success') {
+            location.reload();
+        } else {
+            showNotification(data.message || 'Failed to clear cart', 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        showNotification('Failed to clear cart', 'error');
+    });
+}
+
+function updateCartBadge() {
+    const badge = document.querySelector('.cart-badge');
+    const cartLink = document.getElementById('cart-link');
+
+    if (cartData.count > 0) {
+        if (badge) {
+            badge.textContent = cartData.count;
+            badge.style.display = 'inline-flex';
+        } else {
+            const newBadge = document.createElement('span');
+            newBadge.className = 'cart-badge';
+            newBadge.textContent = cartData.count;
+            newBadge.style.cssText = `
+                position: absolute; top: -8px; right: -12px; 
+                background: #ff6b35; color: white; border-radius: 50%; 
+                width: 24px; height: 24px; font-size: 0.8rem; 
+                display: flex; align-items: center; justify-content: center; 
+                font-weight: 600; box-shadow: 0 2px 4px rgba(0,0,0,0.2);
+                animation: pulse 2s infinite;
+            `;
+            cartLink.appendChild(newBadge);
+        }
+    } else {
+        if (badge) {
+            badge.style.display = 'none';
+        }
+    }
+}
+
+function updateCartSummary() {
+    const subtotalEl = document.querySelector('[data-summary="subtotal"]');
+    const itemsEl = document.querySelector('[data-summary="items"]');
+    const totalEl = document.querySelector('[data-summary="total"]');
+
+    if (subtotalEl) subtotalEl.textContent = cartData.total.toFixed(2).replace(/\B(?=(\d{3})+(?!\d))/g, ',');
+    if (itemsEl) itemsEl.textContent = cartData.items;
+}
+
+function checkEmptyCart() {
+    const cartItems = document.querySelectorAll('.cart-item');
+    if (cartItems.length === 0) {
+        document.querySelector('.cart-items-section').innerHTML = `
+            <div style="text-align: center; padding: 3rem 2rem;">
+                <i class="fas fa-check-circle" style="font-size: 4rem; color: #28a745; margin-bottom: 1rem;"></i>
+                <h3 style="color: #333; margin-bottom: 1rem;">Cart Cleared Successfully!</h3>
+                <p style="color: #666; margin-bottom: 2rem;">Your shopping cart is now empty.</p>
+                <a href="${document.body.dataset.productListUrl}" class="btn btn-primary" style="padding: 1rem 2rem;">Continue Shopping</a>
+            </div>
+        `;
+        cartData.count = 0;
+        cartData.items = 0;
+        updateCartBadge();
+    }
+}
+
+function showNotification(message, type = 'info') {
+    // Remove existing notifications
+    const existing = document.querySelector('.cart-notification');
+    if (existing) existing.remove();
+
+    const notification = document.createElement('div');
+    notification.className = `cart-notification ${type}`;
+    notification.innerHTML = `
+        <i class="fas ${type === 'success' ? 'fa-check-circle' : type === 'error' ? 'fa-exclamation-triangle' : 'fa-info-circle'}" style="margin-right: 0.5rem;"></i>
+        ${message}
+        <button onclick="this.parentElement.remove()" style="background: none; border: none; font-size: 1.2rem; cursor: pointer; margin-left: auto; color: inherit;">×</button>
+    `;
+
+    notification.style.cssText = `
+        position: fixed; top: 20px; right: 20px; z-index: 10000;
+        background: ${type === 'success' ? '#d4edda' : type === 'error' ? '#f8d7da' : '#d1ecf1'};
+        color: ${type === 'success' ? '#155724' : type === 'error' ? '#721c24' : '#0c5460'};
+        padding: 1rem 1.5rem; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.15);
+        display: flex; align-items: center; gap: 0.75rem; max-width: 350px;
+        transform: translateX(400px); transition: transform 0.3s ease;
+        border: 1px solid ${type === 'success' ? '#c3e6cb' : type === 'error' ? '#f5c6cb' : '#bee5eb'};
+    `;
+
+    document.body.appendChild(notification);
+
+    // Animate in
+    requestAnimationFrame(() => {
+        notification.style.transform = 'translateX(0)';
+    });
+
+    // Auto remove after 4 seconds
+    setTimeout(() => {
+        notification.style.transform = 'translateX(400px)';
+        setTimeout(() => {
+            if (notification.parentNode) {
+                notification.parentNode.removeChild(notification);
+            }
+        }, 300);
+    }, 4000);
+}
+
+// Add CSS for cart badge animation
+const style = document.createElement('style');
+style.textContent = `
+    @keyframes pulse {
+        0% { transform: scale(1); }
+        50% { transform: scale(1.1); }
+        100% { transform: scale(1); }
+    }
+
+    .cart-badge {
+        animation: pulse 2s infinite;
+    }
+
+    .quantity-btn {
+        width: 32px; height: 32px; border: 1px solid #ddd; 
+        background: white; border-radius: 6px; cursor: pointer;
+        display: flex; align-items: center; justify-content: center;
+        transition: all 0.2s ease; color: #666;
+    }
+
+    .quantity-btn:hover:not(:disabled) {
+        background: #f8f9fa; border-color: #ff6b35; color: #ff6b35;
+        transform: scale(1.05);
+    }
+
+    .quantity-btn:disabled {
+        cursor: not-allowed; opacity: 0.5;
+    }
+
+    .remove-item-btn:hover {
+        background: #c82333 !important; transform: translateY(-1px);
+    }
+
+    .featured-badge, .verified-badge {
+        display: inline-flex; align-items: center; font-size: 0.75rem;
+        animation: slideIn 0.3s ease;
+    }
+
+    @keyframes slideIn {
+        from { opacity: 0; transform: translateX(-10px); }
+        to { opacity: 1; transform: translateX(0); }
+    }
+
+    @media (max-width: 768px) {
+        .header-container {
+            flex-direction: column; gap: 1rem; padding: 1rem;
+        }
+
+        .nav-menu {
+            flex-wrap: wrap; justify-content: center; gap: 1rem;
+        }
+
+        .cart-item {
+            flex-direction: column; text-align: center; gap: 1rem;
+        }
+
+        .cart-item-quantity {
+            order: -1; width: 100%; text-align: center;
+        }
+    }
+`;
+document.head.appendChild(style);
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', function() {
+    updateCartBadge();
+    updateCartSummary();
+
+    // Add CSRF token to forms if not present
+    const forms = document.querySelectorAll('form');
+    forms.forEach(form => {
+        if (!form.querySelector('[name=csrfmiddlewaretoken]')) {
+            const csrfInput = document.createElement('input');
+            csrfInput.type = 'hidden';
+            csrfInput.name = 'csrfmiddlewaretoken';
+            csrfInput.value = getCookie('csrftoken');
+            form.appendChild(csrfInput);
+        }
+    });
+});
+
+// Add event listeners for quantity buttons
+document.addEventListener('click', function(e) {
+    if (e.target.closest('.quantity-btn')) {
+        e.preventDefault();
+    }
+});
@@ -0,0 +1,45 @@
+// Enhanced form validation
+document.getElementById('login-form').addEventListener('submit', function(e) {
+    const username = document.getElementById('username').value;
+    const password = document.getElementById('password').value;
+
+    if (!username || !password) {
+        e.preventDefault();
+        showNotification('Please fill in all fields', 'error');
+        return false;
+    }
+
+    if (password.length < 6) {
+        e.preventDefault();
+        showNotification('Password must be at least 6 characters', 'error');
+        return false;
+    }
+
+    // Show loading state
+    const submitBtn = this.querySelector('button[type="submit"]');
+    const originalText = submitBtn.innerHTML;
+    submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Signing In...';
+    submitBtn.disabled = true;
+
+    // Reset after 3 seconds (in real app, this would be after response)
+    setTimeout(() => {
+        submitBtn.innerHTML = originalText;
+        submitBtn.disabled = false;
+    }, 3000);
+});
+
+// Password visibility toggle
+const passwordField = document.getElementById('password');
+const togglePassword = document.createElement('i');
+togglePassword.className = 'fas fa-eye';
+togglePassword.style.cssText = 'position: absolute; right: 1rem; top: 50%; transform: translateY(-50%); color: #999; cursor: pointer; z-index: 10;';
+
+passwordField.parentNode.style.position = 'relative';
+passwordField.parentNode.appendChild(togglePassword);
+
+togglePassword.addEventListener('click', function() {
+    const type = passwordField.getAttribute('type') === 'password' ? 'text' : 'password';
+    passwordField.setAttribute('type', type);
+    this.classList.toggle('fa-eye');
+    this.classList.toggle('fa-eye-slash');
+});
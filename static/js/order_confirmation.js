@@ -0,0 +1,60 @@
+function printOrder() {
+    window.print();
+}
+
+// Auto-print option (commented out to avoid annoying users)
+// if (confirm('Would you like to print your order confirmation?')) {
+//     printOrder();
+// }
+
+// Email sharing functionality
+document.addEventListener('DOMContentLoaded', function() {
+    // Add copy to clipboard for order number
+    const orderNumber = document.querySelector('.footer-bottom p');
+    if (orderNumber) {
+        orderNumber.addEventListener('click', function() {
+            navigator.clipboard.writeText(`Order #${document.body.dataset.orderNumber}`);
+            showNotification('Order number copied to clipboard!', 'success');
+        });
+    }
+
+    // Animate timeline on load
+    const timelineSteps = document.querySelectorAll('.order-status > div');
+    timelineSteps.forEach((step, index) => {
+        setTimeout(() => {
+            step.style.opacity = '1';
+            step.style.transform = 'translateY(0)';
+        }, index * 200);
+    });
+});
+
+// Print styles
+const printStyles = `
+    @media print {
+        header, footer, .no-print { 
+            display: none !important; 
+        }
+        .cart-container { 
+            max-width: none; 
+            box-shadow: none;
+            border: 1px solid #ddd;
+        }
+        body { 
+            background: white; 
+            font-size: 12pt;
+        }
+        h1, h2, h3 { 
+            color: black !important;
+        }
+        .btn { 
+            display: none !important;
+        }
+        .timeline-line {
+            background: #333 !important;
+        }
+    }
+`;
+
+const styleSheet = document.createElement('style');
+styleSheet.textContent = printStyles;
+document.head.appendChild(styleSheet);
@@ -0,0 +1,402 @@
+// Product Detail Page JavaScript
+let detailQuantity = 1;
+const product = document.body.dataset;
+let maxStock = parseInt(product.stock);
+let basePrice = parseFloat(product.price);
+let isInWishlist = false;
+
+// Initialize page
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('Product detail page loaded:', product.name);
+
+    // Initialize quantity and total
+    updateDetailQuantity(0);
+
+    // Initialize add to cart button
+    initAddToCartButton();
+
+    // Initialize image gallery
+    initImageGallery();
+
+    // Initialize wishlist
+    initWishlist();
+
+    // Add event listeners
+    initEventListeners();
+
+    // Update cart badge
+    if (typeof updateCartBadge === 'function') {
+        updateCartBadge();
+    }
+});
+
+function initAddToCartButton() {
+    const addToCartBtn = document.getElementById('detail-add-to-cart-btn');
+    if (addToCartBtn) {
+        addToCartBtn.addEventListener('click', function(e) {
+            e.preventDefault();
+            const quantity = parseInt(document.getElementById('detail-quantity-input').value);
+            addProductToCart(product.id, quantity, product.name, this);
+        });
+    }
+}
+
+function initImageGallery() {
+    const thumbnails = document.querySelectorAll('.thumbnail');
+    thumbnails.forEach((thumb, index) => {
+        thumb.addEventListener('click', function() {
+            changeMainImage(index);
+        });
+    });
+}
+
+function initWishlist() {
+    // Check if product is in wishlist (you'd get this from context)
+    const wishlistIcon = document.getElementById('wishlist-icon');
+    if (wishlistIcon && isInWishlist) {
+        wishlistIcon.classList.remove('far');
+        wishlistIcon.classList.add('fas');
+        wishlistIcon.parentElement.style.color = '#e74c3c';
+    }
+}
+
+function initEventListeners() {
+    // Quantity input handling
+    const quantityInput = document.getElementById('detail-quantity-input');
+    if (quantityInput) {
+        quantityInput.addEventListener('input', function() {
+            let value = parseInt(this.value);
+            if (isNaN(value) || value < 1) value = 1;
+            if (value > maxStock) value = maxStock;
+            this.value = value;
+            detailQuantity = value;
+            updateDetailTotal();
+        });
+
+        // Prevent manual editing with arrow keys
+        quantityInput.addEventListener('keydown', function(e) {
+            if (e.key === 'ArrowUp' || e.key === 'ArrowDown') {
+                e.preventDefault();
+            }
+        });
+    }
+}
+
+function updateDetailQuantity(change) {
+    let newQuantity = detailQuantity + change;
+    newQuantity = Math.max(1, Math.min(newQuantity, maxStock));
+    detailQuantity = newQuantity;
+
+    const quantityInput = document.getElementById('detail-quantity-input');
+    if (quantityInput) {
+        quantityInput.value = newQuantity;
+    }
+
+    updateDetailTotal();
+    updateQuantityButtons();
+}
+
+function updateDetailTotal() {
+    const totalPrice = basePrice * detailQuantity;
+    const totalElement = document.getElementById('detail-total-price');
+    if (totalElement) {
+        totalElement.textContent = totalPrice.toLocaleString('en-US', {
+            style: 'currency',
+            currency: 'USD'
+        });
+    }
+}
+
+function updateQuantityButtons() {
+    const decrementBtn = document.querySelector('.decrement');
+    const incrementBtn = document.querySelector('.increment');
+
+    if (decrementBtn) {
+        decrementBtn.disabled = detailQuantity <= 1;
+        decrementBtn.style.opacity = detailQuantity <= 1 ? '0.5' : '1';
+        decrementBtn.style.cursor = detailQuantity <= 1 ? 'not-allowed' : 'pointer';
+    }
+
+    if (incrementBtn) {
+        incrementBtn.disabled = detailQuantity >= maxStock;
+        incrementBtn.style.opacity = detailQuantity >= maxStock ? '0.5' : '1';
+        incrementBtn.style.cursor = detailQuantity >= maxStock ? 'not-allowed' : 'pointer';
+    }
+}
+
+function toggleWishlist(productId) {
+    const button = event.currentTarget;
+    const icon = button.querySelector('i');
+    const originalIconClass = icon.className;
+
+    // Show loading
+    icon.className = 'fas fa-spinner fa-spin';
+    button.disabled = true;
+
+    // Toggle wishlist (AJAX call)
+    fetch(`/wishlist/${productId}/toggle/`, {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken'),
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'success') {
+            isInWishlist = data.is_in_wishlist;
+
+            if (isInWishlist) {
+                icon.className = 'fas fa-heart';
+                button.style.color = '#e74c3c';
+                button.style.borderColor = '#e74c3c';
+                showNotification('Added to wishlist!', 'success');
+            } else {
+                icon.className = 'far fa-heart';
+                button.style.color = '#999';
+                button.style.borderColor = '#e9ecef';
+                showNotification('Removed from wishlist', 'info');
+            }
+        } else {
+            // Revert on error
+            icon.className = originalIconClass;
+            showNotification(data.message || 'Failed to update wishlist', 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Wishlist error:', error);
+        icon.className = originalIconClass;
+        showNotification('Failed to update wishlist', 'error');
+    })
+    .finally(() => {
+        button.disabled = false;
+    });
+}
+
+function shareProduct(productId) {
+    if (navigator.share) {
+        navigator.share({
+            title: `${product.name} - YourStore`,
+            text: 'Check out this amazing product!',
+            url: window.location.href
+        }).catch(console.error);
+    } else {
+        // Fallback: copy to clipboard
+        navigator.clipboard.writeText(window.location.href).then(() => {
+            showNotification('Link copied to clipboard!', 'success');
+        }).catch(() => {
+            // Ultimate fallback: show the URL
+            prompt('Copy this link to share:', window.location.href);
+        });
+    }
+}
+
+function notifyWhenAvailable(productId) {
+    const button = event.target.closest('button');
+    const originalText = button.innerHTML;
+
+    button.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Sending...';
+    button.disabled = true;
+
+    // Simulate notification request
+    setTimeout(() => {
+        button.innerHTML = '<i class="fas fa-check"></i> Notified!';
+        button.style.background = '#28a745';
+        showNotification('You\'ll be notified when this product is back in stock!', 'success');
+
+        setTimeout(() => {
+            button.innerHTML = originalText;
+            button.style.background = '';
+            button.disabled = false;
+        }, 2000);
+    }, 1000);
+}
+
+function contactSeller(productId) {
+    // Open contact form or email
+    const subject = encodeURIComponent(`Inquiry about ${product.name}`);
+    const body = encodeURIComponent(`Hi, I'm interested in your ${product.name} product. Could you provide more information?`);
+    window.open(`mailto:seller@yourstore.com?subject=${subject}&body=${body}`, '_blank');
+}
+
+function toggleImageZoom(img) {
+    if (!img.style.transform || img.style.transform === 'scale(1)') {
+        img.style.transform = 'scale(1.5)';
+        img.style.transformOrigin = 'center center';
+        document.body.style.overflow = 'hidden';
+    } else {
+        img.style.transform = 'scale(1)';
+        document.body.style.overflow = '';
+    }
+}
+
+function changeMainImage(thumbnailIndex) {
+    const mainImage = document.getElementById('main-product-image');
+    const thumbnails = document.querySelectorAll('.thumbnail');
+
+    if (!mainImage) return;
+
+    // In a real app, you'd have multiple images
+    // For now, we'll just update the active thumbnail
+    thumbnails.forEach((thumb, index) => {
+        if (index === thumbnailIndex) {
+            thumb.classList.add('active');
+            thumb.style.borderColor = '#ff6b35';
+            thumb.style.transform = 'scale(1.05)';
+        } else {
+            thumb.classList.remove('active');
+            thumb.style.borderColor = 'transparent';
+            thumb.style.transform = 'scale(1)';
+        }
+    });
+
+    // Add click effect
+    thumbnails[thumbnailIndex].style.transform = 'scale(0.95)';
+    setTimeout(() => {
+        thumbnails[thumbnailIndex].style.transform = 'scale(1.05)';
+    }, 150);
+}
+
+function scrollToTop() {
+    window.scrollTo({
+        top: 0,
+        behavior: 'smooth'
+    });
+}
+
+function printProduct() {
+    window.print();
+}
+
+// Quantity controls for detail page
+function updateDetailQuantity(change) {
+    const quantityInput = document.getElementById('detail-quantity-input');
+    if (!quantityInput) return;
+
+    let currentValue = parseInt(quantityInput.value) || 1;
+    let newValue = currentValue + change;
+
+    // Ensure valid range
+    newValue = Math.max(1, Math.min(newValue, maxStock));
+
+    quantityInput.value = newValue;
+    detailQuantity = newValue;
+
+    // Update total price
+    updateDetailTotal();
+
+    // Update button states
+    updateQuantityButtons();
+}
+
+// Global functions used by inline handlers
+window.updateDetailQuantity = updateDetailQuantity;
+window.toggleWishlist = toggleWishlist;
+window.shareProduct = shareProduct;
+window.notifyWhenAvailable = notifyWhenAvailable;
+window.contactSeller = contactSeller;
+window.changeMainImage = changeMainImage;
+window.toggleImageZoom = toggleImageZoom;
+window.scrollToTop = scrollToTop;
+window.printProduct = printProduct;
+
+// Add CSS for this page
+const pageStyle = document.createElement('style');
+pageStyle.textContent = `
+    .product-detail-container {
+        animation: fadeIn 0.5s ease;
+    }
+
+    @keyframes fadeIn {
+        from { opacity: 0; transform: translateY(20px); }
+        to { opacity: 1; transform: translateY(0); }
+    }
+
+    .product-main-image-container:hover .image-actions {
+        opacity: 1;
+    }
+
+    .quantity-btn:hover:not(:disabled) {
+        border-color: #ff6b35 !important;
+        background: #fff5f5 !important;
+        color: #ff6b35 !important;
+        transform: scale(1.05);
+    }
+
+    .btn-wishlist.liked {
+        color: #e74c3c !important;
+        border-color: #e74c3c !important;
+    }
+
+    .btn-wishlist:hover {
+        transform: scale(1.1);
+        box-shadow: 0 4px 12px rgba(231, 76, 60, 0.3);
+    }
+
+    .btn-share:hover {
+        background: #5a6268;
+        transform: translateY(-2px);
+    }
+
+    .thumbnail:hover {
+        transform: scale(1.05);
+        z-index: 10;
+    }
+
+    .thumbnail.active {
+        transform: scale(1.05);
+    }
+
+    @media print {
+        .no-print, header, footer, .product-actions {
+            display: none !important;
+        }
+
+        .product-detail-container {
+            max-width: none !important;
+            box-shadow: none !important;
+        }
+
+        body {
+            background: white;
+            font-size: 12pt;
+        }
+    }
+
+    @media (max-width: 768px) {
+        .product-detail-container {
+            grid-template-columns: 1fr;
+            gap: 2rem;
+            padding: 0 1rem;
+        }
+
+        .add-to-cart-section {
+            padding: 1.5rem !important;
+        }
+
+        .quantity-selector {
+            flex-direction: column;
+            gap: 1rem;
+            align-items: stretch;
+        }
+
+        .quantity-selector > div {
+            justify-content: center;
+        }
+
+        .product-actions {
+            flex-direction: column;
+        }
+
+        .btn-add-cart {
+            order: 2;
+        }
+
+        .btn-wishlist, .btn-share {
+            order: 1;
+            width: auto !important;
+            padding: 1rem !important;
+        }
+    }
+`;
+document.head.appendChild(pageStyle);
@@ -0,0 +1,281 @@
+// Add to cart functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const addToCartButtons = document.querySelectorAll('.add-to-cart-btn');
+
+    addToCartButtons.forEach(button => {
+        button.addEventListener('click', function(e) {
+            e.preventDefault();
+            addProductToCart(this.dataset.productId, 1, this.dataset.productName);
+        });
+    });
+
+    // Search on Enter
+    const searchInput = document.getElementById('product-search');
+    if (searchInput) {
+        searchInput.addEventListener('keypress', function(e) {
+            if (e.key === 'Enter') {
+                performSearch();
+            }
+        });
+    }
+
+    // Initialize filters
+    applyFilters();
+    updateCartBadge();
+});
+
+function changeQuantity(productId, change) {
+    const button = event.target.closest('.quantity-btn');
+    const container = button.closest('.quantity-selector');
+    const currentQuantity = parseInt(container.querySelector('span').textContent);
+    const newQuantity = Math.max(1, currentQuantity + change);
+
+    // Update display
+    container.querySelector('span').textContent = newQuantity;
+
+    // Add to cart with new quantity
+    const productCard = container.closest('.product-card');
+    const productName = productCard.querySelector('.product-title').textContent;
+    addProductToCart(productId, newQuantity, productName);
+}
+
+function addToWishlist(productId) {
+    const button = event.target.closest('.btn-wishlist');
+    const heartIcon = button.querySelector('i');
+
+    // Toggle heart icon
+    if (heartIcon.classList.contains('far')) {
+        heartIcon.classList.remove('far');
+        heartIcon.classList.add('fas');
+        button.style.color = '#e74c3c';
+        showNotification('Added to wishlist!', 'success');
+    } else {
+        heartIcon.classList.remove('fas');
+        heartIcon.classList.add('far');
+        button.style.color = '#999';
+        showNotification('Removed from wishlist', 'info');
+    }
+
+    // AJAX call to wishlist endpoint (if implemented)
+    fetch(`/wishlist/${productId}/toggle/`, {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken'),
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    }).catch(error => console.error('Wishlist error:', error));
+}
+
+function performSearch() {
+    const searchTerm = document.getElementById('product-search').value.trim();
+    const category = document.getElementById('category-filter').value;
+
+    let url = document.body.dataset.productListUrl;
+    const params = new URLSearchParams();
+
+    if (searchTerm) {
+        params.append('q', searchTerm);
+    }
+
+    if (category && category !== 'all') {
+        params.append('category', category);
+    }
+
+    if (params.toString()) {
+        url += '?' + params.toString();
+    }
+
+    window.location.href = url;
+}
+
+function filterByCategory() {
+    const category = document.getElementById('category-filter').value;
+    const currentUrl = new URL(window.location);
+
+    if (category === 'all') {
+        currentUrl.searchParams.delete('category');
+    } else {
+        currentUrl.searchParams.set('category', category);
+    }
+
+    // Preserve other parameters
+    const searchTerm = document.getElementById('product-search').value.trim();
+    if (searchTerm) {
+        currentUrl.searchParams.set('q', searchTerm);
+    }
+
+    window.location.href = currentUrl.toString();
+}
+
+function applyFilters() {
+    const verifiedOnly = document.getElementById('verified-only').checked;
+    const inStockOnly = document.getElementById('in-stock').checked;
+    const featuredOnly = document.getElementById('featured-only').checked;
+
+    const products = document.querySelectorAll('.product-card');
+    let visibleCount = 0;
+
+    products.forEach(product => {
+        let show = true;
+
+        // Category filter (already applied server-side)
+        const categoryFilter = document.getElementById('category-filter').value;
+        const productCategory = product.dataset.category;
+        if (categoryFilter !== 'all' && productCategory !== categoryFilter) {
+            show = false;
+        }
+
+        // Verified filter
+        if (verifiedOnly && product.dataset.verified !== 'true') {
+            show = false;
+        }
+
+        // Stock filter
+        if (inStockOnly && parseInt(product.dataset.stock) <= 0) {
+            show = false;
+        }
+
+        // Featured filter
+        if (featuredOnly && product.dataset.featured !== 'true') {
+            show = false;
+        }
+
+        product.style.display = show ? 'block' : 'none';
+
+        if (show) visibleCount++;
+    });
+
+    // Update counter
+    const counter = document.querySelector('.products-counter');
+    if (counter) {
+        counter.textContent = `${visibleCount} products found`;
+    }
+}
+
+// Add CSS animations
+const style = document.createElement('style');
+style.textContent = `
+    @keyframes cartPulse {
+        0%, 100% { transform: scale(1); }
+        50% { transform: scale(1.05); }
+    }
+
+    @keyframes itemAdded {
+        0% { transform: scale(0.8) rotate(-180deg); opacity: 0; }
+        50% { transform: scale(1.1) rotate(0deg); opacity: 1; }
+        100% { transform: scale(1) rotate(0deg); opacity: 1; }
+    }
+
+    .add-to-cart-btn {
+        position: relative; overflow: hidden;
+        transition: all 0.3s ease;
+    }
+
+    .add-to-cart-btn:hover:not(:disabled) {
+        transform: translateY(-2px);
+        box-shadow: 0 4px 15px rgba(255, 107, 53, 0.3);
+    }
+
+    .add-to-cart-btn:active {
+        transform: scale(0.95);
+    }
+
+    .loading-spinner i {
+        color: white;
+    }
+
+    .product-card {
+        transition: all 0.3s ease;
+        position: relative;
+        overflow: hidden;
+    }
+
+    .product-card:hover {
+        transform: translateY(-8px);
+        box-shadow: 0 12px 40px rgba(0,0,0,0.15);
+    }
+
+    .product-card:hover .product-image img {
+        transform: scale(1.05);
+    }
+
+    .product-image img {
+        transition: transform 0.3s ease;
+    }
+
+    .featured-badge, .verified-badge {
+        animation: slideIn 0.3s ease;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+
+    @keyframes slideIn {
+        from { opacity: 0; transform: translateY(-10px); }
+        to { opacity: 1; transform: translateY(0); }
+    }
+
+    .search-box:focus {
+        border-color: #ff6b35 !important;
+        box-shadow: 0 0 0 3px rgba(255, 107, 53, 0.1);
+    }
+
+    .search-btn:hover {
+        background: #e55a2b;
+    }
+
+    .btn-outline:hover {
+        background: #6c757d;
+        color: white;
+    }
+
+    /* Responsive */
+    @media (max-width: 768px) {
+        .header-container {
+            flex-direction: column;
+            gap: 1rem;
+            padding: 1rem;
+        }
+
+        .nav-menu {
+            flex-wrap: wrap;
+            justify-content: center;
+            gap: 1rem;
+        }
+
+        .products-section {
+            padding: 0 1rem;
+        }
+
+        .product-actions {
+            flex-direction: column;
+            gap: 0.5rem;
+        }
+
+        .add-to-cart-btn {
+            order: 2;
+        }
+
+        .quantity-selector {
+            order: 1;
+            width: 100%;
+        }
+
+        .cart-badge {
+            top: -5px; right: -8px;
+            width: 20px; height: 20px;
+            font-size: 0.7rem;
+        }
+    }
+`;
+document.head.appendChild(style);
+
+// Listen for cart updates
+window.addEventListener('cartUpdated', function(e) {
+    cartData.count = e.detail.count;
+    updateCartBadge();
+    showNotification(`${e.detail.action === 'added' ? 'Added to cart!' : 'Cart updated!'} • ${cartData.count} items`, 'success');
+});
+
+// Handle browser back/forward button
+window.addEventListener('popstate', function() {
+    applyFilters();
+});
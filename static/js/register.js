@@ -0,0 +1,115 @@
+// Enhanced registration form validation
+const passwordField = document.querySelector('input[name="password1"]');
+const confirmPasswordField = document.querySelector('input[name="password2"]');
+const emailField = document.querySelector('input[name="email"]');
+const termsCheckbox = document.getElementById('terms');
+const submitBtn = document.getElementById('submit-btn');
+
+// Password validation
+passwordField.addEventListener('input', function() {
+    const password = this.value;
+    const hasLength = password.length >= 8;
+    const hasNumber = /\d/.test(password);
+    const hasSpecial = /[!@#$%^&*(),.?":{}|<>]/.test(password);
+
+    document.getElementById('length-check').style.display = hasLength ? 'inline' : 'none';
+    document.getElementById('number-check').style.display = hasNumber ? 'inline' : 'none';
+    document.getElementById('special-check').style.display = hasSpecial ? 'inline' : 'none';
+});
+
+// Email validation
+emailField.addEventListener('blur', function() {
+    const email = this.value;
+    const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+    const errorDiv = document.getElementById('email-error');
+
+    if (email && !emailRegex.test(email)) {
+        errorDiv.textContent = 'Please enter a valid email address';
+        errorDiv.style.display = 'block';
+        this.classList.add('error');
+    } else {
+        errorDiv.style.display = 'none';
+        this.classList.remove('error');
+    }
+});
+
+// Password confirmation
+confirmPasswordField.addEventListener('input', function() {
+    if (this.value !== passwordField.value) {
+        this.setCustomValidity('Passwords do not match');
+        this.classList.add('error');
+    } else {
+        this.setCustomValidity('');
+        this.classList.remove('error');
+    }
+});
+
+// Terms checkbox
+termsCheckbox.addEventListener('change', function() {
+    const errorDiv = document.getElementById('terms-error');
+    if (!this.checked) {
+        errorDiv.style.display = 'block';
+    } else {
+        errorDiv.style.display = 'none';
+    }
+});
+
+// Form submission
+document.getElementById('register-form').addEventListener('submit', function(e) {
+    let isValid = true;
+
+    // Check terms
+    if (!termsCheckbox.checked) {
+        e.preventDefault();
+        document.getElementById('terms-error').style.display = 'block';
+        isValid = false;
+    }
+
+    // Check email
+    const email = emailField.value;
+    const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+    if (email && !emailRegex.test(email)) {
+        e.preventDefault();
+        document.getElementById('email-error').style.display = 'block';
+        isValid = false;
+    }
+
+    // Check passwords
+    if (passwordField.value !== confirmPasswordField.value) {
+        e.preventDefault();
+        confirmPasswordField.classList.add('error');
+        isValid = false;
+    }
+
+    if (!isValid) {
+        e.preventDefault();
+        showNotification('Please fix the errors above', 'error');
+        return false;
+    }
+
+    // Show loading
+    submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Creating Account...';
+    submitBtn.disabled = true;
+});
+
+function togglePassword(icon) {
+    const passwordField = icon.previousElementSibling;
+    const type = passwordField.getAttribute('type') === 'password' ? 'text' : 'password';
+    passwordField.setAttribute('type', type);
+    icon.classList.toggle('fa-eye');
+    icon.classList.toggle('fa-eye-slash');
+}
+
+// Custom checkbox styling
+document.querySelectorAll('.checkbox-container input').forEach(checkbox => {
+    checkbox.addEventListener('change', function() {
+        const checkmark = this.nextElementSibling;
+        if (this.checked) {
+            checkmark.style.backgroundColor = '#ff6b35';
+            checkmark.style.borderColor = '#ff6b35';
+        } else {
+            checkmark.style.backgroundColor = '#f8f9fa';
+            checkmark.style.borderColor = '#ddd';
+        }
+    });
+});
@@ -203,4 +203,179 @@ function clearFieldError(field) {
     const error = field.parentNode.querySelector('.error-message');
     if (error) error.remove();
     field.classList.remove('error');
-}
\ No newline at end of file
+}
+
+// Shared cart helpers, used by the catalog and cart pages. Pages pass their
+// cart state in data-cart-* attributes on <body>.
+var cartData = {
+    count: parseInt(document.body.dataset.cartCount) || 0,
+    items: parseInt(document.body.dataset.cartItems) || 0,
+    total: parseFloat(document.body.dataset.cartTotal) || 0
+};
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+function addProductToCart(productId, quantity = 1, productName = '', button = null) {
+    button = button || event.target.closest('.add-to-cart-btn');
+    if (!button) return;
+
+    // Show loading state
+    const originalText = button.querySelector('.btn-text').textContent;
+    const loadingSpinner = button.querySelector('.loading-spinner');
+    const cartIcon = button.querySelector('i');
+
+    button.disabled = true;
+    button.querySelector('.btn-text').textContent = 'Adding...';
+    loadingSpinner.style.display = 'inline-block';
+    cartIcon.style.display = 'none';
+
+    // Make AJAX request
+    fetch(`/add-to-cart/${productId}/`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'X-CSRFToken': getCookie('csrftoken'),
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: `quantity=${quantity}`
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'success') {
+            // Update global cart data
+            cartData.count = data.cart_count;
+            cartData.items = data.cart_items;
+
+            // Update UI
+            button.querySelector('.btn-text').textContent = 'Added! ✓';
+            button.style.background = 'linear-gradient(135deg, #28a745, #20c997)';
+
+            // Update cart badge
+            updateCartBadge();
+
+            // Show success notification
+            showNotification(`${data.message} • ${data.cart_count} items in cart`, 'success');
+
+            // Animate button
+            button.style.transform = 'scale(0.95)';
+            setTimeout(() => {
+                button.style.transform = 'scale(1)';
+            }, 150);
+
+            // Reset button after 2 seconds
+            setTimeout(() => {
+                button.disabled = false;
+                button.querySelector('.btn-text').textContent = originalText;
+                loadingSpinner.style.display = 'none';
+                cartIcon.style.display = 'inline-block';
+                button.style.background = 'linear-gradient(135deg, #ff6b35, #f7931e)';
+            }, 2000);
+
+            // Trigger custom event for other pages
+            window.dispatchEvent(new CustomEvent('cartUpdated', { 
+                detail: { count: data.cart_count, action: 'added' } 
+            }));
+
+        } else {
+            // Error handling
+            button.disabled = false;
+            button.querySelector('.btn-text').textContent = originalText;
+            loadingSpinner.style.display = 'none';
+            cartIcon.style.display = 'inline-block';
+            showNotification(data.message || 'Failed to add to cart', 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        button.disabled = false;
+        button.querySelector('.btn-text').textContent = originalText;
+        loadingSpinner.style.display = 'none';
+        cartIcon.style.display = 'inline-block';
+        showNotification('Network error. Please try again.', 'error');
+    });
+}
+
+function updateCartBadge() {
+    const badge = document.querySelector('.cart-badge');
+    const cartLink = document.getElementById('cart-link');
+
+    if (cartData.count > 0) {
+        if (badge) {
+            badge.textContent = cartData.count > 99 ? '99+' : cartData.count;
+            badge.style.display = 'flex';
+        } else if (cartLink) {
+            const newBadge = document.createElement('span');
+            newBadge.className = 'cart-badge';
+            newBadge.textContent = cartData.count > 99 ? '99+' : cartData.count;
+            newBadge.style.cssText = `
+                position: absolute; top: -8px; right: -12px; 
+                background: linear-gradient(135deg, #ff6b35, #f7931e); 
+                color: white; border-radius: 50%; width: 24px; height: 24px; 
+                font-size: 0.8rem; font-weight: 600; display: flex; 
+                align-items: center; justify-content: center; 
+                box-shadow: 0 2px 6px rgba(255, 107, 53, 0.4); 
+                animation: cartPulse 2s infinite; border: 2px solid white;
+            `;
+            cartLink.style.position = 'relative';
+            cartLink.appendChild(newBadge);
+        }
+    } else {
+        if (badge) {
+            badge.style.display = 'none';
+        }
+    }
+}
+
+function showNotification(message, type = 'info') {
+    // Remove existing notification
+    const existing = document.querySelector('.product-notification');
+    if (existing) existing.remove();
+
+    const notification = document.createElement('div');
+    notification.className = `product-notification ${type}`;
+    notification.innerHTML = `
+        <i class="fas ${type === 'success' ? 'fa-check-circle' : type === 'error' ? 'fa-exclamation-triangle' : 'fa-info-circle'}" style="margin-right: 0.5rem;"></i>
+        ${message}
+    `;
+
+    notification.style.cssText = `
+        position: fixed; top: 20px; left: 50%; transform: translateX(-50%); z-index: 10000;
+        background: ${type === 'success' ? '#d4edda' : type === 'error' ? '#f8d7da' : '#d1ecf1'};
+        color: ${type === 'success' ? '#155724' : type === 'error' ? '#721c24' : '#0c5460'};
+        padding: 1rem 1.5rem; border-radius: 8px; box-shadow: 0 4px 12px rgba(0,0,0,0.15);
+        display: flex; align-items: center; gap: 0.5rem; max-width: 90%; 
+        border: 1px solid ${type === 'success' ? '#c3e6cb' : type === 'error' ? '#f5c6cb' : '#bee5eb'};
+    `;
+
+    document.body.appendChild(notification);
+
+    // Animate in
+    requestAnimationFrame(() => {
+        notification.style.transform = 'translateX(-50%) translateY(0)';
+        notification.style.opacity = '1';
+    });
+
+    // Auto remove after 3 seconds
+    setTimeout(() => {
+        notification.style.transform = 'translateX(-50%) translateY(-20px)';
+        notification.style.opacity = '0';
+        setTimeout(() => {
+            if (notification.parentNode) {
+                notification.parentNode.removeChild(notification);
+            }
+        }, 300);
+    }, 3000);
+}
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Product, Order, OrderItem
+from .models import Cart, Product, Order, OrderItem, OutboundEmail
 
 admin.site.register(Product)
 admin.site.register(Order)
-admin.site.register(OrderItem)
\ No newline at end of file
+admin.site.register(OrderItem)
+admin.site.register(OutboundEmail)
+admin.site.register(Cart)
\ No newline at end of file
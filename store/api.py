@@ -0,0 +1,211 @@
+"""
+Read-only JSON API over the catalog.
+
+    GET /api/products/              listing, same filters as the product list
+                                    (q, category, verified, stock) plus page
+                                    and per_page
+    GET /api/products/<id>/         one product
+    GET /api/products/batch/?ids=   several products by id, in the given order
+    GET /api/categories/            categories with their product counts
+
+Rows are read with ``.values()`` and never built into model instances.
+``fields=name,price,...`` selects a subset of ``FIELDS`` (sparse fieldsets).
+
+Every response carries a strong ETag computed from the ids and
+``updated_at`` of the products it contains, read with a narrow query before
+anything else. A matching ``If-None-Match`` gets a ``304 Not Modified``
+without the full rows being fetched or serialized.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.views.decorators.http import require_GET
+
+from .catalog import filter_products, listing_filters
+from .models import Category, Product
+from .pagination import cached_count
+
+# Public field name -> lookup passed to .values()
+FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+    'price': 'price',
+    'short_description': 'short_description',
+    'description': 'description',
+    'category': 'category__slug',
+    'category_name': 'category__name',
+    'brand': 'brand',
+    'sku': 'sku',
+    'weight': 'weight',
+    'dimensions': 'dimensions',
+    'image': 'image',
+    'stock': 'stock',
+    'is_featured': 'is_featured',
+    'is_verified': 'is_verified',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+LIST_FIELDS = ('id', 'name', 'slug', 'price', 'short_description', 'category', 'image', 'stock', 'is_featured')
+MAX_BATCH = 100
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error(message, status=400):
+    return JsonResponse({'status': 'error', 'message': message}, status=status)
+
+
+def requested_fields(request, default):
+    """Parse ``fields=`` into a tuple of public field names"""
+    value = request.GET.get('fields')
+    if not value:
+        return default
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise BadRequest(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
+
+def make_etag(fields, versions, *extra):
+    """Strong ETag over the selected fields and ``(id, updated_at)`` pairs"""
+    digest = hashlib.md5(repr((fields, list(versions), extra)).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def serialize(row, fields):
+    item = {field: row[FIELDS[field]] for field in fields}
+    if 'image' in item:
+        item['image'] = default_storage.url(item['image']) if item['image'] else None
+    return item
+
+
+def values(queryset, fields):
+    # id is always read so rows can be matched up, even when not returned
+    return queryset.values(*dict.fromkeys(['id'] + [FIELDS[field] for field in fields]))
+
+
+def conditional(request, etag, build):
+    """Answer 304 for a matching ETag, otherwise ``build()`` the response"""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+        response['ETag'] = etag
+    return response
+
+
+def api_view(view):
+    """GET only, with ``BadRequest`` turned into a 400 JSON error"""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return error(str(e))
+    return wrapper
+
+
+def positive_int(value, name, default):
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f'{name} must be an integer')
+    if value < 1:
+        raise BadRequest(f'{name} must be at least 1')
+    return value
+
+
+@api_view
+def product_list(request):
+    """Filtered, paginated product listing"""
+    fields = requested_fields(request, LIST_FIELDS)
+    products = filter_products(Product.objects.all(), **listing_filters(request.GET))
+    per_page = min(
+        positive_int(request.GET.get('per_page'), 'per_page', getattr(settings, 'API_PAGE_SIZE', 24)),
+        getattr(settings, 'API_MAX_PAGE_SIZE', 100),
+    )
+    page = positive_int(request.GET.get('page'), 'page', 1)
+    count = cached_count(products)
+    num_pages = max(1, -(-count // per_page))
+    if page > num_pages:
+        return error('Page not found', status=404)
+    start = (page - 1) * per_page
+    window = products[start:start + per_page]
+
+    def build():
+        return JsonResponse({
+            'count': count,
+            'page': page,
+            'num_pages': num_pages,
+            'results': [serialize(row, fields) for row in values(window, fields)],
+        })
+
+    versions = window.values_list('id', 'updated_at')
+    return conditional(request, make_etag(fields, versions, count, page, per_page), build)
+
+
+@api_view
+def product_detail(request, pk):
+    """A single product, all fields unless ``fields`` says otherwise"""
+    fields = requested_fields(request, tuple(FIELDS))
+    versions = list(Product.objects.filter(pk=pk).values_list('id', 'updated_at'))
+    if not versions:
+        return error('Product not found', status=404)
+
+    def build():
+        row = values(Product.objects.filter(pk=pk), fields).get()
+        return JsonResponse(serialize(row, fields))
+
+    return conditional(request, make_etag(fields, versions), build)
+
+
+@api_view
+def product_batch(request):
+    """Products by id (``ids=3,1,2``), returned in the requested order"""
+    fields = requested_fields(request, LIST_FIELDS)
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip()))
+    except ValueError:
+        raise BadRequest('ids must be a comma-separated list of integers')
+    if not ids:
+        raise BadRequest('ids is required')
+    if len(ids) > MAX_BATCH:
+        raise BadRequest(f'At most {MAX_BATCH} ids per request')
+
+    products = Product.objects.filter(pk__in=ids).order_by()
+    versions = sorted(products.values_list('id', 'updated_at'))
+
+    def build():
+        rows = {row['id']: row for row in values(products, fields)}
+        return JsonResponse({
+            'results': [serialize(rows[pk], fields) for pk in ids if pk in rows],
+            'missing': [pk for pk in ids if pk not in rows],
+        })
+
+    return conditional(request, make_etag(fields, versions, ids), build)
+
+
+@api_view
+def category_list(request):
+    """All categories with the number of products in each"""
+    rows = list(
+        Category.objects.annotate(product_count=Count('product'))
+        .order_by('name').values('id', 'name', 'slug', 'product_count')
+    )
+    # Categories have no updated_at; the rows themselves are the version
+    return conditional(
+        request,
+        make_etag(('categories',), [tuple(row.values()) for row in rows]),
+        lambda: JsonResponse({'results': rows}),
+    )
@@ -0,0 +1,43 @@
+"""
+Catalog caching.
+
+Cached catalog data is keyed on a version token stored in the cache itself.
+Any product or category change bumps the token (see ``store.signals``), which
+orphans every entry built from the old catalog instead of deleting keys one
+by one. This works the same with the local-memory and file-based backends.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Product
+
+CATALOG_VERSION_KEY = 'store:catalog:version'
+
+
+def catalog_version():
+    """Return the current catalog version token"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = bump_catalog_version()
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate everything cached from the catalog"""
+    version = uuid.uuid4().hex
+    cache.set(CATALOG_VERSION_KEY, version, None)
+    return version
+
+
+def get_featured_products(limit=8):
+    """Featured products for the home page, falling back to the newest ones"""
+    key = f'store:featured:{catalog_version()}:{limit}'
+    products = cache.get(key)
+    if products is None:
+        products = list(Product.objects.filter(is_featured=True).select_related('category')[:limit])
+        if not products:
+            products = list(Product.objects.all().select_related('category')[:limit])
+        cache.set(key, products, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+    return products
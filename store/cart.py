@@ -0,0 +1,664 @@
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from .models import Cart, CartItem, Product
+from .pricing import ZERO, to_money
+
+# Marks a ``DatabaseCart`` whose row still has to be looked up
+NOT_LOADED = object()
+
+
+@dataclass
+class CartLine:
+    """A cart entry joined with its product"""
+    product: Product
+    quantity: int
+    requested: int
+
+    @property
+    def adjusted(self):
+        return self.quantity != self.requested
+
+    @property
+    def unit_price(self):
+        return to_money(self.product.price)
+
+    @property
+    def subtotal(self):
+        return self.unit_price * self.quantity
+
+
+@dataclass
+class HydratedCart:
+    """Result of validating a session cart against the catalog"""
+    lines: list = field(default_factory=list)
+    items: dict = field(default_factory=dict)
+    removed: list = field(default_factory=list)
+    sold_out: list = field(default_factory=list)
+
+    @property
+    def adjusted(self):
+        return [line for line in self.lines if line.adjusted]
+
+    def get(self, product_id):
+        """Return the line for ``product_id`` or None"""
+        for line in self.lines:
+            if line.product.pk == int(product_id):
+                return line
+        return None
+
+    @property
+    def count(self):
+        return sum(line.quantity for line in self.lines)
+
+    @property
+    def line_count(self):
+        return len(self.lines)
+
+    @property
+    def total(self):
+        return sum((line.subtotal for line in self.lines), ZERO)
+
+
+def hydrate_cart(cart):
+    """
+    Load every product referenced by a session cart in a single query.
+
+    Quantities are clamped to the available stock, and entries whose product
+    no longer exists or is sold out are pruned. ``items`` holds the cleaned
+    ``{product_id: quantity}`` mapping to write back to the session.
+    """
+    result, ids = _cart_ids(cart)
+    products = Product.objects.select_related('category').in_bulk(list(ids.values()))
+    return _fill_cart(result, cart, ids, products)
+
+
+async def ahydrate_cart(cart):
+    """Async ``hydrate_cart``"""
+    result, ids = _cart_ids(cart)
+    products = await Product.objects.select_related('category').ain_bulk(list(ids.values()))
+    return _fill_cart(result, cart, ids, products)
+
+
+def _cart_ids(cart):
+    result = HydratedCart()
+    ids = {}
+    for product_id, quantity in cart.items():
+        try:
+            ids[product_id] = int(product_id)
+        except (TypeError, ValueError):
+            result.removed.append(product_id)
+    return result, ids
+
+
+def _fill_cart(result, cart, ids, products):
+    for product_id, pk in ids.items():
+        product = products.get(pk)
+        if product is None:
+            result.removed.append(product_id)
+            continue
+
+        requested = int(cart[product_id])
+        if requested <= 0:
+            result.removed.append(product_id)
+            continue
+
+        quantity = min(requested, product.stock)
+        if quantity <= 0:
+            result.sold_out.append(product)
+            continue
+
+        result.lines.append(CartLine(product=product, quantity=quantity, requested=requested))
+        result.items[str(product_id)] = quantity
+
+    return result
+
+
+class BaseCart:
+    """
+    Versioned cart storage.
+
+    Besides the ``{product_id: quantity}`` mapping the cart keeps a
+    denormalized summary (item count, line count, subtotal and when it was
+    last validated against stock) that the mutating views update
+    incrementally, so the header badge can be rendered without a query.
+    Subclasses decide where the data lives via ``load`` and ``store``.
+
+    The ``a``-prefixed methods are for async views. Carts kept in the cookie
+    or an already loaded session do no I/O, so they simply run the sync
+    versions; ``DatabaseCart`` overrides them with async queries.
+    """
+    VERSION = 2
+
+    def __init__(self):
+        data = self.load() or {}
+        if data.get('v') != self.VERSION:
+            # Legacy flat cart: keep the quantities and force a revalidation
+            data = {'v': self.VERSION, 'items': dict(data), 'summary': None}
+        self.items = data['items']
+        self.summary = data['summary'] or self._empty_summary()
+        if data['summary'] is None and self.items:
+            self.summary['validated_at'] = None
+
+    def load(self):
+        raise NotImplementedError
+
+    def store(self, data):
+        raise NotImplementedError
+
+    @staticmethod
+    def _empty_summary():
+        return {'count': 0, 'lines': 0, 'subtotal': '0.00', 'validated_at': time.time()}
+
+    def __contains__(self, product_id):
+        return str(product_id) in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def quantity(self, product_id):
+        return self.items.get(str(product_id), 0)
+
+    @property
+    def count(self):
+        return self.summary['count']
+
+    @property
+    def line_count(self):
+        return self.summary['lines']
+
+    @property
+    def is_stale(self):
+        """True when the summary must be revalidated against stock"""
+        validated_at = self.summary['validated_at']
+        if validated_at is None:
+            return True
+        ttl = getattr(settings, 'CART_SUMMARY_TTL', 300)
+        return time.time() - validated_at > ttl
+
+    def set(self, product, quantity):
+        """Set the quantity of ``product``, removing the line at zero"""
+        key, old, quantity = str(product.pk), self.quantity(product.pk), max(int(quantity), 0)
+        self.set_line(key, quantity)
+        self._adjust_summary(product, quantity - old)
+        self.save()
+
+    async def aset(self, product, quantity):
+        await self.aitems()
+        key, old, quantity = str(product.pk), self.quantity(product.pk), max(int(quantity), 0)
+        await self.aset_line(key, quantity)
+        self._adjust_summary(product, quantity - old)
+        await self.asave()
+
+    def _adjust_summary(self, product, delta):
+        self.summary['count'] += delta
+        self.summary['lines'] = len(self.items)
+        subtotal = Decimal(self.summary['subtotal']) + to_money(product.price) * delta
+        self.summary['subtotal'] = str(subtotal)
+
+    def set_line(self, key, quantity):
+        """Store a single line's quantity, zero removing it"""
+        if quantity:
+            self.items[key] = quantity
+        else:
+            self.items.pop(key, None)
+
+    async def aset_line(self, key, quantity):
+        self.set_line(key, quantity)
+
+    async def aitems(self):
+        """Return ``items``, loading them without blocking if needed"""
+        return self.items
+
+    def add(self, product, quantity):
+        self.set(product, self.quantity(product.pk) + quantity)
+
+    async def aadd(self, product, quantity):
+        await self.aitems()
+        await self.aset(product, self.quantity(product.pk) + quantity)
+
+    def remove(self, product_id, product=None):
+        """Drop a line; without its product the summary is marked stale"""
+        if product is not None:
+            self.set(product, 0)
+            return
+        old = self.quantity(product_id)
+        self.set_line(str(product_id), 0)
+        self._forget_line(old)
+        self.save()
+
+    async def aremove(self, product_id, product=None):
+        if product is not None:
+            await self.aset(product, 0)
+            return
+        await self.aitems()
+        old = self.quantity(product_id)
+        await self.aset_line(str(product_id), 0)
+        self._forget_line(old)
+        await self.asave()
+
+    def _forget_line(self, old):
+        self.summary['count'] -= old
+        self.summary['lines'] = len(self.items)
+        self.summary['validated_at'] = None
+
+    def merge(self, items):
+        """Add ``items`` quantities to this cart; revalidated on next use"""
+        for product_id, quantity in items.items():
+            self.items[str(product_id)] = self.items.get(str(product_id), 0) + int(quantity)
+        self.summary['count'] = sum(self.items.values())
+        self.summary['lines'] = len(self.items)
+        self.summary['validated_at'] = None
+        self.save()
+
+    def clear(self):
+        self.items = {}
+        self.summary = self._empty_summary()
+        self.save()
+
+    def replace(self, hydrated):
+        """Reset items and summary from a freshly validated cart"""
+        self._reset(hydrated)
+        self.save()
+
+    async def areplace(self, hydrated):
+        self.replace(hydrated)
+
+    def _reset(self, hydrated):
+        self.items = dict(hydrated.items)
+        self.summary = {
+            'count': hydrated.count,
+            'lines': hydrated.line_count,
+            'subtotal': str(hydrated.total),
+            'validated_at': time.time(),
+        }
+
+    def save(self):
+        self.store({'v': self.VERSION, 'items': self.items, 'summary': self.summary})
+
+    async def asave(self):
+        self.save()
+
+
+class SessionCart(BaseCart):
+    """Cart kept in the session, for anonymous carts too large for the cookie"""
+
+    def __init__(self, session):
+        self.session = session
+        super().__init__()
+
+    def load(self):
+        return self.session.get('cart')
+
+    def store(self, data):
+        self.session['cart'] = data
+        self.session.modified = True
+
+
+class DatabaseCart(BaseCart):
+    """
+    Cart kept in ``Cart``/``CartItem`` rows, used for logged-in users.
+
+    Mutations write only the lines they touch (a quantity change is one
+    upsert on the unique (cart, product) index) plus the cart's summary row,
+    so they cost the same whatever the size of the cart. Lines are loaded on
+    first use; the header badge only reads the summary row.
+    """
+    UPSERT = {
+        'update_conflicts': True,
+        'unique_fields': ['cart', 'product'],
+        'update_fields': ['quantity', 'updated_at'],
+    }
+
+    def __init__(self, user, cart=NOT_LOADED):
+        self.user = user
+        self.cart = Cart.objects.filter(user=user).first() if cart is NOT_LOADED else cart
+        if self.cart is None:
+            self.summary = self._empty_summary()
+        else:
+            validated_at = self.cart.validated_at
+            self.summary = {
+                'count': self.cart.item_count,
+                'lines': self.cart.line_count,
+                'subtotal': str(self.cart.subtotal),
+                'validated_at': validated_at.timestamp() if validated_at else None,
+            }
+
+    @classmethod
+    async def afor_user(cls, user):
+        return cls(user, cart=await Cart.objects.filter(user=user).afirst())
+
+    @cached_property
+    def items(self):
+        if self.cart is None:
+            return {}
+        return {
+            str(product_id): quantity
+            for product_id, quantity in self.cart.items.values_list('product_id', 'quantity')
+        }
+
+    async def aitems(self):
+        if 'items' not in self.__dict__:
+            self.items = {} if self.cart is None else {
+                str(product_id): quantity
+                async for product_id, quantity in self.cart.items.values_list('product_id', 'quantity')
+            }
+        return self.items
+
+    def get_or_create_cart(self):
+        if self.cart is None:
+            self.cart, _ = Cart.objects.get_or_create(user=self.user)
+        return self.cart
+
+    async def aget_or_create_cart(self):
+        if self.cart is None:
+            self.cart, _ = await Cart.objects.aget_or_create(user=self.user)
+        return self.cart
+
+    @staticmethod
+    def _lines(cart, quantities):
+        return [CartItem(cart=cart, product_id=int(key), quantity=quantity) for key, quantity in quantities.items()]
+
+    def upsert(self, quantities):
+        """Insert or update ``{product_id: quantity}`` lines in one statement"""
+        CartItem.objects.bulk_create(self._lines(self.get_or_create_cart(), quantities), **self.UPSERT)
+
+    async def aupsert(self, quantities):
+        await CartItem.objects.abulk_create(self._lines(await self.aget_or_create_cart(), quantities), **self.UPSERT)
+
+    def _lines_to_delete(self, keys):
+        return CartItem.objects.filter(cart=self.cart, product_id__in=[int(key) for key in keys])
+
+    def delete_lines(self, keys):
+        if self.cart is not None and keys:
+            self._lines_to_delete(keys).delete()
+
+    async def adelete_lines(self, keys):
+        if self.cart is not None and keys:
+            await self._lines_to_delete(keys).adelete()
+
+    def set_line(self, key, quantity):
+        if quantity:
+            self.upsert({key: quantity})
+        elif key in self.items:
+            self.delete_lines([key])
+        super().set_line(key, quantity)
+
+    async def aset_line(self, key, quantity):
+        if quantity:
+            await self.aupsert({key: quantity})
+        elif key in await self.aitems():
+            await self.adelete_lines([key])
+        BaseCart.set_line(self, key, quantity)
+
+    def merge(self, items):
+        """Add ``items`` to the cart with a single bulk upsert"""
+        merged = {}
+        for key, quantity in items.items():
+            try:
+                merged[str(int(key))] = self.items.get(str(key), 0) + int(quantity)
+            except (TypeError, ValueError):
+                continue
+        # Lines for products deleted since they were added would violate the FK
+        existing = Product.objects.filter(pk__in=[int(key) for key in merged]).values_list('pk', flat=True)
+        merged = {str(pk): merged[str(pk)] for pk in existing}
+        if not merged:
+            return
+        self.upsert(merged)
+        self.items.update(merged)
+        self.summary['count'] = sum(self.items.values())
+        self.summary['lines'] = len(self.items)
+        self.summary['validated_at'] = None
+        self.save()
+
+    def clear(self):
+        if self.cart is not None:
+            self.cart.items.all().delete()
+        self.items = {}
+        self.summary = self._empty_summary()
+        self.save()
+
+    def _diff(self, hydrated):
+        changed = {key: quantity for key, quantity in hydrated.items.items() if self.items.get(key) != quantity}
+        dropped = [key for key in self.items if key not in hydrated.items]
+        return changed, dropped
+
+    def replace(self, hydrated):
+        """Write back only the lines revalidation actually changed"""
+        changed, dropped = self._diff(hydrated)
+        if changed:
+            self.upsert(changed)
+        self.delete_lines(dropped)
+        self._reset(hydrated)
+        self.save()
+
+    async def areplace(self, hydrated):
+        await self.aitems()
+        changed, dropped = self._diff(hydrated)
+        if changed:
+            await self.aupsert(changed)
+        await self.adelete_lines(dropped)
+        self._reset(hydrated)
+        await self.asave()
+
+    def _summary_fields(self):
+        validated_at = self.summary['validated_at']
+        return {
+            'item_count': self.summary['count'],
+            'line_count': self.summary['lines'],
+            'subtotal': Decimal(self.summary['subtotal']),
+            'validated_at': datetime.fromtimestamp(validated_at, dt_timezone.utc) if validated_at else None,
+            'updated_at': timezone.now(),
+        }
+
+    def save(self):
+        """Persist the summary; lines are written as they change"""
+        if self.cart is None and not self.items:
+            return
+        Cart.objects.filter(pk=self.get_or_create_cart().pk).update(**self._summary_fields())
+
+    async def asave(self):
+        if self.cart is None and not self.items:
+            return
+        cart = await self.aget_or_create_cart()
+        await Cart.objects.filter(pk=cart.pk).aupdate(**self._summary_fields())
+
+
+class CookieCart(BaseCart):
+    """
+    Cart kept in a signed cookie, used for anonymous visitors.
+
+    Browsing and filling a cart never touches the session, so crawlers and
+    first-time visitors don't create session rows. Writes are staged on the
+    request and set on the response by ``CartMiddleware``. A cart too large
+    for ``CART_COOKIE_MAX_SIZE`` moves into the session instead.
+    """
+    salt = 'store.cart'
+
+    def __init__(self, request):
+        self.request = request
+        super().__init__()
+
+    @staticmethod
+    def cookie_name():
+        return getattr(settings, 'CART_COOKIE_NAME', 'cart')
+
+    def load(self):
+        if hasattr(self.request, '_cart_cookie'):
+            return self.request._cart_cookie
+        value = self.request.get_signed_cookie(
+            self.cookie_name(), default=None, salt=self.salt,
+            max_age=getattr(settings, 'CART_COOKIE_AGE', settings.SESSION_COOKIE_AGE),
+        )
+        try:
+            return json.loads(value) if value else None
+        except ValueError:
+            return None
+
+    def store(self, data):
+        if not data['items']:
+            if self.cookie_name() in self.request.COOKIES or hasattr(self.request, '_cart_cookie'):
+                self.request._cart_cookie = None
+            return
+        if len(encode_cart_cookie(data)) > getattr(settings, 'CART_COOKIE_MAX_SIZE', 3500):
+            self.request._cart_cookie = None
+            SessionCart(self.request.session).store(data)
+            return
+        self.request._cart_cookie = data
+
+
+def encode_cart_cookie(data):
+    return json.dumps(data, separators=(',', ':'))
+
+
+def write_cart_cookie(request, response):
+    """Set or delete the cart cookie staged by ``CookieCart`` on ``request``"""
+    if not hasattr(request, '_cart_cookie'):
+        return response
+    data = request._cart_cookie
+    if data is None:
+        response.delete_cookie(CookieCart.cookie_name(), samesite='Lax')
+    else:
+        response.set_signed_cookie(
+            CookieCart.cookie_name(),
+            encode_cart_cookie(data),
+            salt=CookieCart.salt,
+            max_age=getattr(settings, 'CART_COOKIE_AGE', settings.SESSION_COOKIE_AGE),
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite='Lax',
+        )
+    return response
+
+
+def get_cart_storage(request):
+    """
+    Return the cart storage for ``request``, shared for the whole request.
+
+    Logged-in users keep their cart in the database. Anonymous visitors get a
+    signed cookie unless their cart outgrew it and lives in the session;
+    checking the session of a visitor without a session cookie costs nothing.
+    """
+    if not hasattr(request, '_cart_storage'):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            request._cart_storage = DatabaseCart(user)
+        elif 'cart' in request.session:
+            request._cart_storage = SessionCart(request.session)
+        else:
+            request._cart_storage = CookieCart(request)
+    return request._cart_storage
+
+
+async def aget_cart_storage(request):
+    """
+    Async ``get_cart_storage``.
+
+    Resolves the user and loads the session without blocking, so the cart
+    (and anything else reading ``request.session``) is safe to use from the
+    event loop afterwards.
+    """
+    if not hasattr(request, '_cart_storage'):
+        user = await request.auser() if hasattr(request, 'auser') else None
+        if user is not None and user.is_authenticated:
+            request._cart_storage = await DatabaseCart.afor_user(user)
+        elif await request.session.ahas_key('cart'):
+            request._cart_storage = SessionCart(request.session)
+        else:
+            request._cart_storage = CookieCart(request)
+    return request._cart_storage
+
+
+def merge_anonymous_cart(request):
+    """
+    Fold the cart a visitor built before logging in into their saved cart.
+
+    The anonymous cart may be in the cookie or, if it outgrew it, in the
+    session (which survives login); either way it is merged in one bulk
+    upsert and then discarded.
+    """
+    if hasattr(request, '_cart_storage'):
+        del request._cart_storage
+    items = dict(CookieCart(request).items)
+    if 'cart' in request.session:
+        for key, quantity in SessionCart(request.session).items.items():
+            items[key] = items.get(key, 0) + quantity
+        del request.session['cart']
+    CookieCart(request).clear()
+    if items:
+        get_cart_storage(request).merge(items)
+    attach_cart(request)
+
+
+def load_cart(request):
+    """Revalidate the request's cart against stock and persist it"""
+    cart = get_cart_storage(request)
+    hydrated = hydrate_cart(cart.items)
+    cart.replace(hydrated)
+    return hydrated
+
+
+async def aload_cart(request):
+    cart = await aget_cart_storage(request)
+    hydrated = await ahydrate_cart(await cart.aitems())
+    await cart.areplace(hydrated)
+    return hydrated
+
+
+def get_cart(request):
+    """Return the request's validated cart, hydrating it at most once"""
+    if not hasattr(request, '_cart'):
+        request._cart = load_cart(request)
+    return request._cart
+
+
+async def aget_cart(request):
+    if not hasattr(request, '_cart'):
+        request._cart = await aload_cart(request)
+    return request._cart
+
+
+def get_cart_summary(request):
+    """
+    Return the cart storage for badge rendering.
+
+    The stored summary is trusted as long as it is younger than
+    ``CART_SUMMARY_TTL``; otherwise the cart is revalidated first.
+    """
+    cart = get_cart_storage(request)
+    if cart.is_stale:
+        get_cart(request)
+        cart = get_cart_storage(request)
+    return cart
+
+
+async def aget_cart_summary(request):
+    """
+    Async ``get_cart_summary``.
+
+    Afterwards the badge in the context processor renders without queries.
+    """
+    cart = await aget_cart_storage(request)
+    if cart.is_stale:
+        await aget_cart(request)
+    return cart
+
+
+def attach_cart(request):
+    """
+    Attach a lazily hydrated cart to ``request.cart``.
+
+    Nothing is queried until the cart is first used, and the result is shared
+    by the views and the context processor for the rest of the request. Call
+    again after mutating the session cart to drop the stale snapshot.
+    """
+    if hasattr(request, '_cart'):
+        del request._cart
+    request.cart = SimpleLazyObject(lambda: get_cart(request))
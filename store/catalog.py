@@ -0,0 +1,32 @@
+"""
+Product listing filters shared by the HTML listing and the JSON API.
+"""
+from .search import get_search_backend
+
+
+def listing_filters(params):
+    """Read the listing filters from a query string"""
+    return {
+        'query': params.get('q'),
+        'category': params.get('category'),
+        'verified_only': params.get('verified', '0') == '1',
+        'in_stock': params.get('stock', '0') == '1',
+    }
+
+
+def filter_products(products, query=None, category=None, verified_only=False, in_stock=False):
+    """Apply the listing filters to a product queryset"""
+    if query:
+        # Ranked full-text search (FTS5 on SQLite, tsvector on PostgreSQL)
+        products = get_search_backend().search(products, query)
+
+    if category and category != 'all':
+        products = products.filter(category__slug=category)
+
+    if verified_only:
+        products = products.filter(is_verified=True)
+
+    if in_stock:
+        products = products.filter(stock__gt=0)
+
+    return products
@@ -0,0 +1,84 @@
+"""
+Order placement.
+
+``place_order`` turns validated cart lines into an order in one transaction.
+Stock for every line is reserved with a single conditional ``UPDATE ... SET
+stock = stock - n WHERE stock >= n`` (``n`` picked per row with ``CASE``),
+so two buyers racing for the last unit cannot both succeed: the loser's
+update matches fewer rows than it has lines and the whole order rolls back.
+The confirmation email is queued in the same transaction (see store.outbox).
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import Order, OrderItem, Product
+from .outbox import queue_order_confirmation
+from .pricing import quote, to_money
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class InsufficientStock(CheckoutError):
+    """Raised when stock ran out for some lines; nothing was written"""
+
+    def __init__(self, products):
+        self.products = products
+        super().__init__(', '.join(product.name for product in products))
+
+
+def place_order(user, lines, status='confirmed'):
+    """
+    Create an order for ``lines`` (``(product, quantity)`` pairs).
+
+    Raises ``InsufficientStock`` listing every product that could not be
+    reserved, in which case no stock is decremented and no order exists.
+    """
+    lines = sorted(lines, key=lambda line: line[0].pk)
+    if not lines:
+        raise CheckoutError('No items to order')
+
+    now = timezone.now()
+    order_quote = quote(lines)
+    ids = [product.pk for product, quantity in lines]
+    quantities = Case(
+        *[When(pk=product.pk, then=Value(quantity)) for product, quantity in lines],
+        output_field=IntegerField(),
+    )
+    try:
+        with transaction.atomic():
+            reserved = Product.objects.filter(pk__in=ids, stock__gte=quantities).update(
+                stock=F('stock') - quantities,
+                updated_at=now,
+            )
+            if reserved != len(lines):
+                raise InsufficientStock([])
+            order = Order.objects.create(
+                user=user,
+                total_price=order_quote.subtotal,
+                items_count=order_quote.item_count,
+                subtotal=order_quote.subtotal,
+                tax_amount=order_quote.tax,
+                grand_total=order_quote.total,
+                status=status,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=quantity, price=to_money(product.price))
+                for product, quantity in lines
+            ])
+            # Delivered later by the outbox worker, only if this commits
+            queue_order_confirmation(order)
+
+            # update() bypasses the Product signals that invalidate catalog caches
+            transaction.on_commit(bump_catalog_version)
+    except InsufficientStock:
+        # Rolled back; see which lines fell short for the message. Stock may
+        # have moved again since, so never report an empty list.
+        stock = dict(Product.objects.filter(pk__in=ids).values_list('pk', 'stock'))
+        short = [product for product, quantity in lines if stock.get(product.pk, 0) < quantity]
+        raise InsufficientStock(short or [product for product, quantity in lines])
+    return order
+
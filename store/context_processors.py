@@ -1,35 +1,14 @@
-from .models import Product
+from .cart import attach_cart, get_cart_summary
 
 def cart_count(request):
     """Add cart count to all templates"""
-    if not request.session.session_key:
-        request.session.create()
-    
-    cart = request.session.get('cart', {})
-    cart_count = 0
-    
-    # Validate cart items
-    valid_cart = {}
-    for product_id, quantity in cart.items():
-        try:
-            product = Product.objects.get(id=product_id)
-            if quantity <= product.stock:
-                valid_cart[product_id] = quantity
-                cart_count += quantity
-            else:
-                # Adjust to available stock
-                valid_cart[product_id] = product.stock
-                cart_count += product.stock
-        except Product.DoesNotExist:
-            # Remove invalid product
-            continue
-    
-    # Update session if needed
-    if valid_cart != cart:
-        request.session['cart'] = valid_cart
-        request.session.modified = True
-    
+    if not hasattr(request, 'cart'):
+        attach_cart(request)
+
+    # Callables are only resolved when a template actually uses the variable.
+    # The badge reads the summary stored with the cart and only hits the
+    # product table once that summary is older than CART_SUMMARY_TTL.
     return {
-        'cart_count': cart_count,
-        'cart_items': len(valid_cart)
-    }
\ No newline at end of file
+        'cart_count': lambda: get_cart_summary(request).count,
+        'cart_items': lambda: get_cart_summary(request).line_count
+    }
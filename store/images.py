@@ -0,0 +1,151 @@
+"""
+Responsive product image variants.
+
+When a product image is saved, ``schedule_variants`` reads the upload and
+hands the bytes to a process pool, where ``render_variants`` resizes it with
+Pillow to every width in ``PRODUCT_IMAGE_WIDTHS`` as WebP and JPEG. Files are
+named after a hash of the source content, so a URL always serves the same
+bytes and can be cached forever. Back in the web process the files are
+written to storage and recorded on ``Product.image_variants``, which the
+``product_image`` template tag turns into a ``srcset``.
+
+``render_variants`` only deals in bytes and has no Django dependencies so it
+can run in worker processes; the ``generate_thumbnails`` management command
+uses the same function to backfill the catalog in parallel.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (160, 320, 640, 1024)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def get_widths():
+    return tuple(sorted(getattr(settings, 'PRODUCT_IMAGE_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def render_variants(source, widths):
+    """
+    Resize image bytes to each of ``widths`` in every format.
+
+    Returns ``(content_hash, [(fmt, width, bytes)])``. Widths larger than the
+    source are skipped, except that the source width itself is always kept
+    as the largest variant.
+    """
+    from PIL import Image, ImageOps
+
+    digest = hashlib.sha256(source).hexdigest()[:16]
+    with Image.open(io.BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        targets = sorted({width for width in widths if width < image.width} | {min(max(widths), image.width)})
+        variants = []
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt, (pil_format, options) in FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                variants.append((fmt, width, buffer.getvalue()))
+    return digest, variants
+
+
+def variant_name(digest, width, fmt):
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    return f'thumbnails/{digest}-{width}w.{extension}'
+
+
+def store_variants(source_name, digest, variants):
+    """Write rendered variants to storage and return the ``image_variants`` map"""
+    mapping = {'source': source_name, 'hash': digest}
+    for fmt, width, data in variants:
+        name = variant_name(digest, width, fmt)
+        # Content-addressed: an existing file already has these bytes
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(data))
+        mapping.setdefault(fmt, {})[str(width)] = name
+    return mapping
+
+
+def apply_variants(product_id, mapping):
+    """
+    Record variants on the product without re-triggering its signals.
+
+    ``updated_at`` still moves, so cached catalog pages pick up the srcset.
+    """
+    from .caching import bump_catalog_version
+    from .models import Product
+
+    smallest = mapping['jpeg'][min(mapping['jpeg'], key=int)] if mapping.get('jpeg') else None
+    Product.objects.filter(pk=product_id).update(
+        image_variants=mapping, thumbnail=smallest, updated_at=timezone.now()
+    )
+    bump_catalog_version()
+
+
+def read_source(product):
+    with product.image.open('rb') as image:
+        return image.read()
+
+
+def needs_variants(product):
+    return bool(product.image) and product.image_variants.get('source') != product.image.name
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=getattr(settings, 'PRODUCT_IMAGE_WORKERS', 2))
+    return _executor
+
+
+def schedule_variants(product):
+    """
+    Generate variants for ``product`` in the background.
+
+    With ``PRODUCT_IMAGE_ASYNC = False`` the work happens inline instead,
+    which is what tests and one-off scripts usually want.
+    """
+    source_name = product.image.name
+    source = read_source(product)
+    widths = get_widths()
+
+    if not getattr(settings, 'PRODUCT_IMAGE_ASYNC', True):
+        digest, variants = render_variants(source, widths)
+        apply_variants(product.pk, store_variants(source_name, digest, variants))
+        return None
+
+    submitter = threading.get_ident()
+
+    def on_done(future):
+        try:
+            digest, variants = future.result()
+            apply_variants(product.pk, store_variants(source_name, digest, variants))
+        except Exception:
+            logger.exception(f'Failed to generate image variants for product {product.pk}')
+        finally:
+            # Callbacks normally run on an executor thread with its own DB
+            # connection; only an already-finished future runs one inline
+            if threading.get_ident() != submitter:
+                connection.close()
+
+    future = get_executor().submit(render_variants, source, widths)
+    future.add_done_callback(on_done)
+    return future
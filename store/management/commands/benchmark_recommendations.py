@@ -0,0 +1,118 @@
+"""
+Benchmark co-purchase builds and lookups against synthetic order history.
+
+For each order count the command tops the history up with synthetic baskets
+(a few popular products, a long tail) and reports
+
+* a full ``build_co_purchases`` over every order,
+* an incremental run after ``--new-orders`` more orders arrive, including
+  the related-product refresh it triggers, and
+* the request-time reads: the co-purchase counts the ranker uses and the
+  precomputed related products a detail page shows.
+
+Everything it writes is rolled back at the end, so it is safe to point at a
+database with real data in it, though the 1M run needs several minutes::
+
+    python manage.py benchmark_recommendations --orders 10000,100000,1000000
+
+Lookup times are the median over ``--sample`` products, in ms.
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from store.models import Category, CoPurchase, Order, OrderItem, Product
+from store.recommendations import build_co_purchases, co_purchase_counts
+from store.related import get_related_products
+
+BATCH_SIZE = 5000
+
+
+def top_up_products(size, category):
+    """Add products until the catalog holds ``size``; returns every product id"""
+    start = Product.objects.count()
+    for offset in range(start, size, BATCH_SIZE):
+        Product.objects.bulk_create([
+            Product(name=f'Benchmark {i}', slug=f'benchmark-recommendations-{i}',
+                    category=category, price='9.99', stock=100)
+            for i in range(offset, min(size, offset + BATCH_SIZE))
+        ])
+    return list(Product.objects.order_by('pk').values_list('pk', flat=True))
+
+
+def add_orders(count, user, product_ids, rng):
+    """Add ``count`` orders of one to six products, skewed towards popular ones"""
+    weights = [1 / (rank + 1) for rank in range(len(product_ids))]
+    for offset in range(0, count, BATCH_SIZE):
+        orders = Order.objects.bulk_create([
+            Order(user=user, is_completed=True) for _ in range(min(BATCH_SIZE, count - offset))
+        ])
+        items = []
+        for order in orders:
+            basket = set(rng.choices(product_ids, weights, k=rng.randint(1, 6)))
+            items.extend(OrderItem(order=order, product_id=pk, quantity=1, price='9.99') for pk in basket)
+        OrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def median_ms(func, items):
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Benchmark co-purchase builds and recommendation lookups at several order counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', default='10000,100000,1000000',
+                            help='Comma-separated order counts, smallest first')
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--new-orders', type=int, default=1000,
+                            help='Orders added before the incremental run')
+        parser.add_argument('--sample', type=int, default=200,
+                            help='Products to time the lookups on')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['orders'].split(','))
+        except ValueError:
+            raise CommandError('--orders must be a comma-separated list of integers')
+        rng = random.Random(options['seed'])
+
+        self.stdout.write(
+            f'{"orders":>9} {"full build":>11} {"incremental":>12} {"pairs":>9} '
+            f'{"counts":>9} {"related":>9}'
+        )
+        with transaction.atomic():
+            category = Category.objects.create(name='Benchmark', slug='benchmark-recommendations')
+            user = User.objects.create(username='benchmark-recommendations')
+            product_ids = top_up_products(options['products'], category)
+            sample = [Product.objects.get(pk=pk) for pk in rng.sample(product_ids, min(options['sample'], len(product_ids)))]
+            for size in sizes:
+                add_orders(size - Order.objects.count(), user, product_ids, rng)
+                _, full = timed(build_co_purchases, full=True, update_related=False)
+                add_orders(options['new_orders'], user, product_ids, rng)
+                _, incremental = timed(build_co_purchases)
+                counts = median_ms(co_purchase_counts, sample)
+                for product in sample:
+                    get_related_products(product)  # fill on first use
+                related = median_ms(get_related_products, sample)
+                self.stdout.write(
+                    f'{size:>9} {full:>10.1f}s {incremental:>11.2f}s {CoPurchase.objects.count():>9} '
+                    f'{counts:>7.2f}ms {related:>7.2f}ms'
+                )
+            transaction.set_rollback(True)
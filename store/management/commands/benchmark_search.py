@@ -0,0 +1,109 @@
+"""
+Compare product search latency of the search backend against ``icontains``.
+
+For each catalog size the command tops the catalog up with synthetic
+products, rebuilds the search index and times what ``product_list`` does
+for a search: count the matches and fetch the first page. Everything it
+writes is rolled back at the end, so it is safe to point at a database with
+real data in it, though the 1M run needs a few minutes and some disk::
+
+    python manage.py benchmark_search --sizes 1000,100000,1000000
+
+Reported times are the median of ``--repeat`` runs per query, in ms.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from store.models import Category, Product
+from store.search import IContainsBackend, get_search_backend
+
+WORDS = (
+    'steel hammer cordless drill garden hose wireless speaker organic cotton '
+    'leather wallet ceramic mug stainless bottle bamboo cutting board led lamp '
+    'waterproof jacket running shoes yoga mat coffee grinder cast iron skillet '
+    'portable charger bluetooth headphones wooden chair glass vase wool blanket'
+).split()
+DEFAULT_QUERIES = ['hammer', 'wireless speaker', 'stain', 'organic cotton blanket', 'zzzz']
+PAGE_SIZE = 24
+BATCH_SIZE = 5000
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'pa', 'do', 'gu')
+
+
+def vocabulary(rng, size=20000):
+    """The real words above plus made-up ones, so each word is selective"""
+    made_up = {''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)}
+    return list(WORDS) + sorted(made_up)
+
+
+def sentence(rng, words, length):
+    return ' '.join(rng.choice(words) for _ in range(length))
+
+
+def top_up(size, category, rng, words):
+    """Add synthetic products until the catalog holds ``size``"""
+    start = Product.objects.count()
+    for offset in range(start, size, BATCH_SIZE):
+        Product.objects.bulk_create([
+            Product(
+                name=sentence(rng, words, 3).title(),
+                slug=f'benchmark-{i}',
+                category=category,
+                price='9.99',
+                brand=rng.choice(words).title(),
+                short_description=sentence(rng, words, 8),
+                description=sentence(rng, words, 60),
+                stock=rng.randint(0, 20),
+            )
+            for i in range(offset, min(size, offset + BATCH_SIZE))
+        ])
+
+
+def time_search(backend, query, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        products = backend.search(Product.objects.all(), query)
+        products.count()
+        list(products[:PAGE_SIZE])
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Benchmark product search against the icontains scan at several catalog sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000',
+                            help='Comma-separated catalog sizes, smallest first')
+        parser.add_argument('--query', action='append', dest='queries',
+                            help='Search string to time (repeatable)')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        queries = options['queries'] or DEFAULT_QUERIES
+        backend = get_search_backend()
+        icontains = IContainsBackend()
+        rng = random.Random(options['seed'])
+        words = vocabulary(rng)
+
+        self.stdout.write(f'{"products":>9}  {"query":<24} {"icontains":>10} {type(backend).__name__:>20}')
+        with transaction.atomic():
+            category = Category.objects.create(name='Benchmark', slug='benchmark-search')
+            for size in sizes:
+                top_up(size, category, rng, words)
+                backend.rebuild()
+                for query in queries:
+                    scan = time_search(icontains, query, options['repeat'])
+                    indexed = time_search(backend, query, options['repeat'])
+                    self.stdout.write(f'{size:>9}  {query:<24} {scan:>8.1f}ms {indexed:>18.1f}ms')
+            # The index lives in the same database, so this restores it too
+            transaction.set_rollback(True)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.recommendations import build_co_purchases
+
+
+class Command(BaseCommand):
+    help = 'Fold new orders into the co-purchase recommendation counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Drop the existing counts and rebuild from every order',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        run = build_co_purchases(full=options['full'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {run.orders_processed} orders (up to order #{run.last_order_id})'
+        ))
@@ -0,0 +1,46 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from store.images import apply_variants, get_widths, needs_variants, read_source, render_variants, store_variants
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive image variants for every product image'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        products = [
+            product for product in Product.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+            if options['force'] or needs_variants(product)
+        ]
+        widths = get_widths()
+        done = failed = 0
+        workers = options['workers'] or os.cpu_count() or 1
+        # Submit in small waves so only a few source images sit in memory
+        wave = workers * 2
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(products), wave):
+                batch = products[start:start + wave]
+                futures = []
+                for product in batch:
+                    try:
+                        futures.append((product, pool.submit(render_variants, read_source(product), widths)))
+                    except OSError as e:
+                        failed += 1
+                        self.stderr.write(f'{product.pk}: cannot read {product.image.name}: {e}')
+                for product, future in futures:
+                    try:
+                        digest, variants = future.result()
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f'{product.pk}: {e}')
+                        continue
+                    apply_variants(product.pk, store_variants(product.image.name, digest, variants))
+                    done += 1
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {done} products ({failed} failed)'))
@@ -0,0 +1,117 @@
+"""
+Compare the throughput and latency of running deployments.
+
+Start the same code under each server with the same number of workers,
+e.g. for four workers::
+
+    gunicorn -w 4 -b 127.0.0.1:8001 mysite.wsgi
+    uvicorn --workers 4 --port 8002 mysite.asgi:application
+
+and point the command at both::
+
+    python manage.py loadtest wsgi=http://127.0.0.1:8001 asgi=http://127.0.0.1:8002
+
+Each target gets the same paths, request count and client concurrency, one
+after the other, and a row with requests per second and p50/p95/p99
+latency. Add-to-cart and cart updates can be included with ``--path`` and
+``--xhr``; requests never share cookies, so every client is a new visitor.
+"""
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/', '/products/', '/products/?page=2']
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(base_url, paths, total, concurrency, headers):
+    """Issue ``total`` GETs over ``concurrency`` keep-alive connections"""
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip('/')
+    latencies = []
+    errors = []
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            path = prefix + paths[index % len(paths)]
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+                status = e
+            elapsed = time.perf_counter() - started
+            with lock:
+                if isinstance(status, int) and status < 400:
+                    latencies.append(elapsed)
+                else:
+                    errors.append((path, status))
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors
+
+
+class Command(BaseCommand):
+    help = 'Load test one or more running deployments and compare throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='+', help='Base URLs, optionally labelled as label=URL')
+        parser.add_argument('--path', action='append', dest='paths', help=f'Path to request (repeatable, default: {DEFAULT_PATHS})')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per target')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client connections')
+        parser.add_argument('--warmup', type=int, default=100, help='Unmeasured requests sent first')
+        parser.add_argument('--xhr', action='store_true', help='Send X-Requested-With: XMLHttpRequest')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        headers = {'X-Requested-With': 'XMLHttpRequest'} if options['xhr'] else {}
+        concurrency = options['concurrency']
+
+        self.stdout.write(f'{"target":<12} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+        for target in options['targets']:
+            label, _, base_url = target.partition('=')
+            if '://' in label or not base_url:
+                label, base_url = '', target
+            label = label or urlsplit(base_url).netloc
+            if not base_url.startswith('http://'):
+                raise CommandError(f'{target}: expected an http:// URL')
+
+            run(base_url, paths, options['warmup'], concurrency, headers)
+            elapsed, latencies, errors = run(base_url, paths, options['requests'], concurrency, headers)
+            if not latencies:
+                raise CommandError(f'{label}: every request failed, e.g. {errors[0]}')
+
+            self.stdout.write(
+                f'{label:<12} {len(latencies) / elapsed:>9.1f} '
+                f'{statistics.median(latencies) * 1000:>8.1f} '
+                f'{percentile(latencies, 0.95) * 1000:>8.1f} '
+                f'{percentile(latencies, 0.99) * 1000:>8.1f} '
+                f'{len(errors):>7}'
+            )
+            for path, status in errors[:5]:
+                self.stderr.write(f'  {path}: {status}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.related import rebuild_related
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed related products for every product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        total = rebuild_related(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed related products for {total} products'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from the catalog'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        total = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} products with {type(backend).__name__}'
+        ))
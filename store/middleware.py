@@ -0,0 +1,87 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .cart import attach_cart, write_cart_cookie
+from .httpcache import is_shareable
+
+
+class CartMiddleware:
+    """
+    Expose a request-scoped, lazily hydrated cart as ``request.cart`` and
+    write back an anonymous visitor's cart cookie.
+
+    Works in both sync and async stacks, so async views under ASGI don't get
+    pushed into a thread by this middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        attach_cart(request)
+        return write_cart_cookie(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        attach_cart(request)
+        return write_cart_cookie(request, await self.get_response(request))
+
+
+class HttpCacheMiddleware:
+    """
+    Apply the ``@cache_policy`` of catalog views (see ``store.httpcache``).
+
+    Conditional requests from anonymous visitors are answered in
+    ``process_view`` after a single freshness query; full responses get
+    ``Cache-Control``, ``ETag`` and ``Last-Modified`` on the way out.
+    ``If-Modified-Since`` on its own is never answered with a 304.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        policy = getattr(view_func, 'http_cache_policy', None)
+        if policy is None or request.method not in ('GET', 'HEAD'):
+            return None
+        if not is_shareable(request):
+            request._http_cache = (policy, None, None)
+            return None
+        last_modified, etag = policy.freshness()
+        request._http_cache = (policy, last_modified, etag)
+        # Only the ETag is checked: deletions and new categories change it but
+        # not the newest updated_at, so If-Modified-Since alone could be stale
+        return get_conditional_response(request, etag=etag)
+
+    def process_response(self, request, response):
+        if not hasattr(request, '_http_cache') or response.status_code not in (200, 304):
+            return response
+        policy, last_modified, etag = request._http_cache
+        patch_vary_headers(response, ['Cookie'])
+        if etag is None or response.cookies:
+            # Personalised, or about to hand out a cookie: never shared
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        patch_cache_control(response, public=True, max_age=policy.get_max_age())
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
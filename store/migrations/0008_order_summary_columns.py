@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:32
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_order_summaries(apps, schema_editor):
+    Order = apps.get_model('store', 'Order')
+    OrderItem = apps.get_model('store', 'OrderItem')
+    cents = Decimal('0.01')
+    tax_rate = Decimal(str(getattr(settings, 'STORE_TAX_RATE', '0.08')))
+    totals = {
+        row['order']: row
+        for row in OrderItem.objects.values('order').annotate(
+            item_quantity=models.Sum('quantity'),
+            item_subtotal=models.Sum(
+                models.F('quantity') * models.F('price'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+    }
+    orders = list(Order.objects.all())
+    for order in orders:
+        row = totals.get(order.pk, {})
+        order.items_count = row.get('item_quantity') or 0
+        order.subtotal = Decimal(str(row.get('item_subtotal') or order.total_price)).quantize(cents)
+        order.tax_amount = (order.subtotal * tax_rate).quantize(cents, rounding=ROUND_HALF_UP)
+        order.grand_total = order.subtotal + order.tax_amount
+    Order.objects.bulk_update(
+        orders, ['items_count', 'subtotal', 'tax_amount', 'grand_total'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_outboundemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='grand_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='tax_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+        ),
+        migrations.RunPython(backfill_order_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_product_stock_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='copurchaserun',
+            name='finished_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
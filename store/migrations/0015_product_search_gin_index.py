@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.indexes import GinIndex
+
+    from store.search import PostgresSearchBackend
+    Product = apps.get_model('store', 'Product')
+    schema_editor.add_index(
+        Product, GinIndex(PostgresSearchBackend.search_vector(), name=PostgresSearchBackend.index_name)
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        from store.search import PostgresSearchBackend
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % schema_editor.quote_name(PostgresSearchBackend.index_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_outboundemail_claim'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
@@ -22,6 +22,8 @@ class Product(models.Model):
     short_description = models.CharField(max_length=200, blank=True)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
     thumbnail = models.ImageField(upload_to='thumbnails/', null=True, blank=True)
+    # Responsive variants generated by store.images: {'webp': {width: name}, ...}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     sku = models.CharField(max_length=50, blank=True)
     brand = models.CharField(max_length=100, blank=True)
     weight = models.CharField(max_length=20, blank=True)
@@ -33,7 +35,43 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        ordering = ['-created_at']
+        # id breaks ties so keyset pagination has a total order
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Default listing order and keyset pagination
+            models.Index(fields=['-created_at', '-id'], name='product_created_idx'),
+            # Home page featured grid and featured related products. Partial
+            # because boolean filters compile to a bare column test, which
+            # SQLite can't match against a composite (is_featured, ...) index.
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_featured=True),
+                name='product_featured_idx',
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                condition=models.Q(is_featured=True),
+                name='product_cat_featured_idx',
+            ),
+            # Category listing and related products fallback
+            models.Index(fields=['category', '-created_at', '-id'], name='product_cat_created_idx'),
+            # "In stock" and "verified" listing filters
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(stock__gt=0),
+                name='product_in_stock_idx',
+            ),
+            # Counting in-stock matches: the filter's bound parameter can't
+            # match the partial index above, but a range search on this can
+            models.Index(fields=['stock'], name='product_stock_idx'),
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_verified=True),
+                name='product_verified_idx',
+            ),
+            # Newest change, the freshness check for HTTP caching
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         # Set created_at only on first save
@@ -52,6 +90,11 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Denormalized at checkout so order lists need no per-order queries
+    items_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    grand_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=20, default='pending', choices=[
         ('pending', 'Pending'),
         ('confirmed', 'Confirmed'),
@@ -63,12 +106,14 @@ class Order(models.Model):
     shipping_address = models.TextField(blank=True)
     billing_address = models.TextField(blank=True)
     
+    class Meta:
+        indexes = [
+            # Per-user order history, newest first (keyset pagination)
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+        ]
+    
     def __str__(self):
         return f"Order {self.id} by {self.user.username}"
-    
-    @property
-    def items_count(self):
-        return self.items.count()
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -81,4 +126,119 @@ class OrderItem(models.Model):
     
     @property
     def total_price(self):
-        return self.quantity * self.price
\ No newline at end of file
+        return self.quantity * self.price
+
+class RelatedProduct(models.Model):
+    """Precomputed "you may also like" link, refreshed by store.related"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(default=0)
+    rank = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related'], name='unique_related_product'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'rank'], name='related_product_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} -> {self.related.name}"
+
+
+class CoPurchase(models.Model):
+    """Number of orders containing both products (stored in both directions)"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='co_purchases')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='unique_co_purchase'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-orders'], name='co_purchase_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id}: {self.orders}"
+
+
+class CoPurchaseRun(models.Model):
+    """Watermark of the orders already folded into CoPurchase"""
+    last_order_id = models.BigIntegerField(default=0)
+    orders_processed = models.PositiveIntegerField(default=0)
+    full_rebuild = models.BooleanField(default=False)
+    finished_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-finished_at']
+
+
+class OutboundEmail(models.Model):
+    """Email queued by a request and delivered by the outbox worker"""
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, default=STATUS_PENDING, choices=[
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ])
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Set by the worker that claimed the row; while sending, next_attempt_at
+    # is when that claim expires
+    claim_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class Cart(models.Model):
+    """A logged-in user's cart, with a summary kept in step with its items"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    item_count = models.PositiveIntegerField(default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # When the summary was last checked against stock; null means stale
+    validated_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cart of {self.user.username} ({self.item_count} items)"
+
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Also the target of the quantity upserts in store.cart
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} of {self.product_id} in cart {self.cart_id}"
@@ -0,0 +1,151 @@
+"""
+Transactional email outbox.
+
+Requests never talk to the mail server. They call ``queue_email`` inside
+their own transaction, so an email exists if and only if the change that
+triggered it was committed. The ``send_outbound_emails`` management command
+drains the queue with ``deliver_pending``: due rows are claimed, then split
+across a thread pool, each thread sends its share over a single SMTP
+connection, and failures are retried with exponential backoff until
+``OUTBOX_MAX_ATTEMPTS``.
+
+Several workers may drain the same outbox. A conditional UPDATE moves each due
+row to ``sending`` for exactly one of them, and the claim lasts
+``OUTBOX_CLAIM_TIMEOUT`` seconds; rows left ``sending`` by a worker that died
+become due again once it expires, so delivery is at least once.
+
+Worker threads only talk to the mail server; every database write happens on
+the calling thread, which keeps the outbox safe on SQLite.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(subject, body, recipients, from_email=None):
+    """Queue an email for the outbox worker"""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        recipients=list(recipients),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def queue_order_confirmation(order):
+    """Queue the confirmation email for a freshly placed order"""
+    if not order.user.email:
+        return None
+    return queue_email(
+        subject=f'Order #{order.id} Confirmation - YourStore',
+        body=f'Thank you for your order! Your order #{order.id} has been received and is being processed.',
+        recipients=[order.user.email],
+    )
+
+
+def _send_batch(emails):
+    """Send ``emails`` over one connection, returning ``{id: error or None}``"""
+    results = {}
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as e:
+        return {email.id: str(e) or type(e).__name__ for email in emails}
+    try:
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipients,
+                connection=connection,
+            )
+            try:
+                message.send()
+                results[email.id] = None
+            except Exception as e:
+                results[email.id] = str(e) or type(e).__name__
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+    return results
+
+
+def claim_due(batch_size=100):
+    """Claim up to ``batch_size`` due emails for this worker and return them"""
+    now = timezone.now()
+    # Pending rows, and sending rows whose claim has expired
+    claimable = OutboundEmail.objects.filter(
+        status__in=[OutboundEmail.STATUS_PENDING, OutboundEmail.STATUS_SENDING],
+        next_attempt_at__lte=now,
+    )
+    ids = list(claimable.values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    lease = getattr(settings, 'OUTBOX_CLAIM_TIMEOUT', 300)
+    # Re-checking the filter in the UPDATE means a row another worker claimed
+    # since the SELECT above is skipped rather than claimed twice
+    claimable.filter(id__in=ids).update(
+        status=OutboundEmail.STATUS_SENDING,
+        claim_token=token,
+        next_attempt_at=now + timedelta(seconds=lease),
+    )
+    return list(OutboundEmail.objects.filter(claim_token=token, status=OutboundEmail.STATUS_SENDING))
+
+
+def deliver_pending(batch_size=100, workers=4):
+    """
+    Claim and send one batch of due emails.
+
+    Returns ``(sent, failed)`` counts for the batch; ``failed`` includes
+    emails that will be retried later.
+    """
+    due = claim_due(batch_size)
+    if not due:
+        return 0, 0
+
+    workers = max(1, min(workers, len(due)))
+    shares = [due[index::workers] for index in range(workers)]
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for share_results in pool.map(_send_batch, shares):
+            results.update(share_results)
+
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+    backoff = getattr(settings, 'OUTBOX_RETRY_BACKOFF', 30)
+    finished = timezone.now()
+    sent = failed = 0
+    for email in due:
+        error = results.get(email.id, 'not attempted')
+        email.attempts += 1
+        email.claim_token = ''
+        if error is None:
+            email.status = OutboundEmail.STATUS_SENT
+            email.sent_at = finished
+            email.last_error = ''
+            sent += 1
+            continue
+        failed += 1
+        email.last_error = error
+        if email.attempts >= max_attempts:
+            email.status = OutboundEmail.STATUS_FAILED
+            logger.error(f'Giving up on email {email.id} after {email.attempts} attempts: {error}')
+        else:
+            email.status = OutboundEmail.STATUS_PENDING
+            email.next_attempt_at = finished + timedelta(seconds=backoff * 2 ** (email.attempts - 1))
+    OutboundEmail.objects.bulk_update(
+        due, ['status', 'attempts', 'claim_token', 'last_error', 'next_attempt_at', 'sent_at']
+    )
+    return sent, failed
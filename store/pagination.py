@@ -0,0 +1,176 @@
+"""
+Pagination helpers for large product listings.
+
+``CachedCountPaginator`` is a drop-in ``Paginator`` that caches the
+``COUNT(*)`` for a filtered queryset, and ``KeysetPaginator`` walks the
+catalog with opaque cursors instead of ``OFFSET`` so deep pages cost the same
+as the first one.
+
+Both have async counterparts (``aget_page``/``apage``) that return pages
+whose rows are already fetched, for rendering from async views.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'store.pagination.cursor'
+
+
+def cached_count(queryset, timeout=None):
+    """Return ``queryset.count()``, cached per distinct SQL statement"""
+    if queryset.query.is_empty():
+        # .none() has no SQL to key on, and nothing to count
+        return 0
+    if timeout is None:
+        timeout = getattr(settings, 'PRODUCT_COUNT_CACHE_TIMEOUT', 60)
+    return cache.get_or_set(count_cache_key(queryset), queryset.count, timeout)
+
+
+async def acached_count(queryset, timeout=None):
+    """Async ``cached_count``"""
+    if queryset.query.is_empty():
+        return 0
+    if timeout is None:
+        timeout = getattr(settings, 'PRODUCT_COUNT_CACHE_TIMEOUT', 60)
+    key = count_cache_key(queryset)
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, timeout)
+    return count
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    return f'store:count:{digest}'
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator whose total count is served from the cache"""
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+    async def aget_page(self, number):
+        self.count = await acached_count(self.object_list)
+        page = self.get_page(number)
+        page.object_list = [obj async for obj in page.object_list]
+        return page
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, paginator):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.paginator = paginator
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def count(self):
+        """Cached total for the whole listing, only queried when rendered"""
+        return self.paginator.count
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over ``(-created_at, -id)``.
+
+    Works for any model with a ``created_at`` column, e.g. products in the
+    catalog and a user's orders.
+
+    Cursors are signed, so clients can only hand back positions the server
+    produced. The queryset must not be ordered by anything else (e.g. search
+    relevance); its existing ordering is replaced.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by('-created_at', '-id')
+        self.per_page = per_page
+
+    @staticmethod
+    def encode_cursor(obj, direction):
+        return signing.dumps(
+            {'c': obj.created_at.isoformat(), 'i': obj.pk, 'd': direction},
+            salt=CURSOR_SALT,
+            compress=True,
+        )
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            created_at = parse_datetime(data['c'])
+            if created_at is None or data['d'] not in ('next', 'prev'):
+                raise ValueError
+            return created_at, int(data['i']), data['d']
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+
+    @cached_property
+    def count(self):
+        return cached_count(self.queryset)
+
+    def page(self, cursor=None):
+        rows, direction = self._rows(cursor)
+        return self._build(list(rows), cursor, direction)
+
+    async def apage(self, cursor=None):
+        """Async ``page``; the total count is fetched as well"""
+        rows, direction = self._rows(cursor)
+        page = self._build([row async for row in rows], cursor, direction)
+        self.count = await acached_count(self.queryset)
+        return page
+
+    def _rows(self, cursor):
+        if not cursor:
+            return self.queryset[:self.per_page + 1], 'next'
+
+        created_at, pk, direction = self.decode_cursor(cursor)
+        if direction == 'next':
+            rows = self.queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        else:
+            rows = self.queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by('created_at', 'id')
+        return rows[:self.per_page + 1], direction
+
+    def _build(self, rows, cursor, direction):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'prev':
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        next_cursor = self.encode_cursor(rows[-1], 'next') if rows and has_next else None
+        previous_cursor = self.encode_cursor(rows[0], 'prev') if rows and has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor, self)
@@ -0,0 +1,111 @@
+"""
+Cart and order pricing.
+
+All money is ``Decimal`` quantized to cents with ``ROUND_HALF_UP``. A whole
+cart is priced in one pass by ``quote``, and views hand the resulting
+``Quote`` to templates so nothing is recomputed with float filters there.
+
+Tax is configurable: ``STORE_TAX_RATE`` is the default rate and
+``STORE_TAX_RATES_BY_CATEGORY`` overrides it per category slug. Tax is
+accumulated unrounded across lines and rounded once for the order.
+"""
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+
+CENTS = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def to_money(amount):
+    """Quantize ``amount`` to cents"""
+    return Decimal(str(amount)).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def default_tax_rate():
+    return Decimal(str(getattr(settings, 'STORE_TAX_RATE', '0.08')))
+
+
+def tax_rate_for(product):
+    """Tax rate applying to ``product``"""
+    rates = getattr(settings, 'STORE_TAX_RATES_BY_CATEGORY', {})
+    category = getattr(product, 'category', None)
+    if category is not None and category.slug in rates:
+        return Decimal(str(rates[category.slug]))
+    return default_tax_rate()
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    product: object
+    quantity: int
+    unit_price: Decimal
+    total: Decimal
+    tax_rate: Decimal
+
+
+@dataclass(frozen=True)
+class Quote:
+    lines: tuple
+    subtotal: Decimal
+    tax: Decimal
+    total: Decimal
+
+    @property
+    def tax_rate(self):
+        """The rate every line is taxed at, or None when the rates differ"""
+        rates = {line.tax_rate for line in self.lines}
+        if not rates:
+            return default_tax_rate()
+        return rates.pop() if len(rates) == 1 else None
+
+    @property
+    def tax_rate_percent(self):
+        """``tax_rate`` as a display percentage, e.g. ``8``"""
+        rate = self.tax_rate
+        return None if rate is None else (rate * 100).normalize()
+
+    @property
+    def item_count(self):
+        return sum(line.quantity for line in self.lines)
+
+
+def quote(lines):
+    """
+    Price ``lines`` in a single pass.
+
+    Each line is ``(product, quantity)`` priced at the current
+    ``product.price``, or ``(product, quantity, unit_price)`` to price at a
+    recorded unit price such as ``OrderItem.price``.
+    """
+    priced = []
+    subtotal = ZERO
+    tax = Decimal('0')
+    for line in lines:
+        product, quantity = line[0], int(line[1])
+        unit_price = to_money(line[2] if len(line) > 2 else product.price)
+        total = unit_price * quantity
+        rate = tax_rate_for(product)
+        subtotal += total
+        tax += total * rate
+        priced.append(PricedLine(product, quantity, unit_price, total, rate))
+    tax = to_money(tax)
+    return Quote(
+        lines=tuple(priced),
+        subtotal=subtotal,
+        tax=tax,
+        total=subtotal + tax,
+    )
+
+
+def quote_order(order, items=None):
+    """
+    Price an existing order from its recorded unit prices.
+
+    Pass ``items`` already loaded with their products and categories to
+    avoid another query.
+    """
+    if items is None:
+        items = order.items.select_related('product__category')
+    return quote((item.product, item.quantity, item.price) for item in items)
@@ -0,0 +1,25 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from .models import Category
+from .testing import QueryBudgetExceeded
+
+
+@pytest.fixture
+def categories(test_database):
+    yield Category.objects.bulk_create([Category(name=f'Fixture {i}', slug=f'fixture-{i}') for i in range(3)])
+    Category.objects.all().delete()
+
+
+def test_fixture_records_queries(categories, query_budget):
+    with query_budget(1) as budget:
+        Client().get(reverse('api_category_list'))
+    assert len(budget.queries) == 1
+
+
+def test_fixture_reports_n_plus_one(categories, query_budget):
+    with pytest.raises(QueryBudgetExceeded, match=r'N\+1: ran 3 times'):
+        with query_budget():
+            for category in Category.objects.all():
+                Category.objects.get(pk=category.pk)
@@ -0,0 +1,160 @@
+"""
+Co-purchase recommendations built from order history.
+
+``build_co_purchases`` reads ``OrderItem`` rows a chunk of orders at a time,
+groups them into baskets and counts how often each pair of products is
+bought together. Counts are accumulated in a sparse ``Counter`` keyed by
+product pair, so memory stays bounded by one chunk's pairs no matter how
+large the history is.
+
+Each chunk is flushed to the ``CoPurchase`` table in its own transaction,
+together with the run's ``CoPurchaseRun`` watermark, so checkout is never
+blocked for longer than one chunk and an interrupted run resumes where it
+stopped. The next incremental run only reads orders placed after the
+watermark.
+
+Only the top ``CO_PURCHASE_NEIGHBOURS`` neighbours of each product are kept;
+the rest are pruned at the end of every run, which bounds the table at N
+rows per product. A pruned pair starts counting again from zero if it comes
+back, so below the top N counts are approximate; ``--full`` recomputes
+them exactly.
+
+Product pages don't read these counts directly: they feed the co-purchase
+ranker in ``store.related``, and every run refreshes the precomputed related
+products of the products whose neighbours changed.
+"""
+from collections import Counter
+from itertools import combinations
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from .models import CoPurchase, CoPurchaseRun, Order, OrderItem
+
+# Orders with more distinct products than this are skipped: they add
+# O(n^2) pairs and say little about what belongs together
+MAX_BASKET_SIZE = 50
+
+
+def iter_chunks(after_order_id=0, chunk_size=2000):
+    """
+    Yield ``(last_order_id, baskets)`` for orders after ``after_order_id``.
+
+    Each chunk covers up to ``chunk_size`` orders and is read with its own
+    query, so no cursor stays open across the per-chunk commits.
+    """
+    while True:
+        order_ids = list(
+            Order.objects.filter(pk__gt=after_order_id)
+            .order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not order_ids:
+            return
+        baskets = {}
+        rows = OrderItem.objects.filter(
+            order_id__gt=after_order_id, order_id__lte=order_ids[-1],
+        ).values_list('order_id', 'product_id')
+        for order_id, product_id in rows:
+            baskets.setdefault(order_id, set()).add(product_id)
+        after_order_id = order_ids[-1]
+        yield after_order_id, list(baskets.values())
+
+
+def count_pairs(baskets):
+    """Sparse co-occurrence counts for an iterable of baskets"""
+    counts = Counter()
+    for basket in baskets:
+        if len(basket) > MAX_BASKET_SIZE:
+            continue
+        counts.update(combinations(sorted(basket), 2))
+    return counts
+
+
+def flush_pairs(counts, batch_size=500):
+    """
+    Add ``{(a, b): n}`` pair counts onto the stored ``CoPurchase`` rows.
+
+    Each batch is one upsert that increments existing rows in place (SQLite
+    and PostgreSQL share the ``ON CONFLICT`` syntax), so nothing is read
+    back. Returns the ids of the products whose neighbours changed.
+    """
+    deltas = Counter()
+    for (a, b), n in counts.items():
+        deltas[(a, b)] += n
+        deltas[(b, a)] += n
+    rows = [(a, b, n) for (a, b), n in deltas.items()]
+    table = connection.ops.quote_name(CoPurchase._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {table} (product_id, other_id, orders) '
+                f'VALUES {", ".join(["(%s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT (product_id, other_id) DO UPDATE SET orders = {table}.orders + excluded.orders',
+                [value for row in batch for value in row],
+            )
+    return {a for a, _ in deltas}
+
+
+def prune_neighbours(product_ids, keep=None, batch_size=500):
+    """Drop all but the ``keep`` most co-purchased neighbours of each product"""
+    if keep is None:
+        keep = getattr(settings, 'CO_PURCHASE_NEIGHBOURS', 50)
+    product_ids = sorted(product_ids)
+    for start in range(0, len(product_ids), batch_size):
+        ranked = CoPurchase.objects.filter(product_id__in=product_ids[start:start + batch_size]).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('product_id'),
+                order_by=[F('orders').desc(), F('other_id').asc()],
+            ),
+        )
+        with transaction.atomic():
+            CoPurchase.objects.filter(pk__in=Subquery(ranked.filter(position__gt=keep).values('pk'))).delete()
+
+
+def build_co_purchases(full=False, chunk_size=2000, update_related=True):
+    """
+    Fold new orders into the co-purchase counts.
+
+    With ``full=True`` the counts are dropped and rebuilt from every order.
+    Unless ``update_related`` is false, the related products of every product
+    whose neighbours changed are refreshed afterwards. Returns the
+    ``CoPurchaseRun`` recorded for this pass.
+    """
+    from .related import refresh_related_ids
+
+    with transaction.atomic():
+        if full:
+            CoPurchase.objects.all().delete()
+            after = 0
+        else:
+            latest = CoPurchaseRun.objects.order_by('-pk').first()
+            after = latest.last_order_id if latest else 0
+        # Created with the reset, so a full run interrupted part way resumes
+        # from its own watermark rather than an older run's
+        run = CoPurchaseRun.objects.create(last_order_id=after, full_rebuild=full)
+
+    touched = set()
+    for last_order_id, baskets in iter_chunks(after, chunk_size):
+        with transaction.atomic():
+            touched |= flush_pairs(count_pairs(baskets))
+            run.last_order_id = last_order_id
+            run.orders_processed += len(baskets)
+            run.save(update_fields=['last_order_id', 'orders_processed'])
+    prune_neighbours(touched)
+    if update_related:
+        refresh_related_ids(touched)
+    return run
+
+
+def co_purchase_counts(product, limit=200):
+    """``{other_id: orders}`` for the products most often bought with ``product``"""
+    rows = (
+        CoPurchase.objects.filter(product=product)
+        .order_by('-orders')
+        .values_list('other_id', 'orders')[:limit]
+    )
+    return dict(rows)
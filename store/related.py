@@ -0,0 +1,215 @@
+"""
+Precomputed related products.
+
+``product_detail`` reads the top related products for a product from the
+``RelatedProduct`` table in a single indexed lookup. Rows are rebuilt here,
+incrementally from the ``Product`` signals and in bulk by the
+``rebuild_related_products`` management command. Co-purchase scores come
+from the counts maintained by ``store.recommendations``, whose builds refresh
+the products they touch.
+
+Candidates are scored by a weighted sum of rankers. Each ranker is a callable
+``ranker(product, candidates) -> {candidate_id: score}`` with scores in
+``[0, 1]``; the ``RELATED_PRODUCT_RANKERS`` setting maps dotted paths to
+weights so rankers can be added or re-weighted without touching this module.
+
+Products that come out with nothing related are remembered in the cache for
+``RELATED_PRODUCTS_EMPTY_TIMEOUT`` seconds, so their detail pages don't
+recompute (and write) on every view.
+"""
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Product, RelatedProduct
+from .recommendations import co_purchase_counts
+
+DEFAULT_RANKERS = {
+    'store.related.rank_category': 3.0,
+    'store.related.rank_brand': 2.0,
+    'store.related.rank_co_purchase': 2.0,
+    'store.related.rank_featured': 0.5,
+}
+
+# Upper bound on candidates scored per product, newest first
+MAX_CANDIDATES = 200
+
+# Category peers refreshed when a new product is added
+PEERS_REFRESHED = 50
+
+
+def rank_category(product, candidates):
+    return {
+        candidate.pk: 1.0
+        for candidate in candidates
+        if product.category_id and candidate.category_id == product.category_id
+    }
+
+
+def rank_brand(product, candidates):
+    brand = product.brand.strip().lower()
+    return {
+        candidate.pk: 1.0
+        for candidate in candidates
+        if brand and candidate.brand.strip().lower() == brand
+    }
+
+
+def rank_featured(product, candidates):
+    return {candidate.pk: 1.0 for candidate in candidates if candidate.is_featured}
+
+
+def rank_co_purchase(product, candidates):
+    counts = co_purchase_counts(product, limit=MAX_CANDIDATES)
+    if not counts:
+        return {}
+    top = max(counts.values())
+    return {candidate.pk: counts[candidate.pk] / top for candidate in candidates if candidate.pk in counts}
+
+
+@lru_cache(maxsize=None)
+def get_rankers():
+    rankers = getattr(settings, 'RELATED_PRODUCT_RANKERS', DEFAULT_RANKERS)
+    return [(import_string(path), weight) for path, weight in rankers.items()]
+
+
+def candidate_products(product):
+    """Products that could be related to ``product``"""
+    match = Q(pk__in=list(co_purchase_counts(product, limit=MAX_CANDIDATES)))
+    if product.category_id:
+        match |= Q(category_id=product.category_id)
+    if product.brand.strip():
+        match |= Q(brand__iexact=product.brand.strip())
+    return list(
+        Product.objects.filter(match).exclude(pk=product.pk)
+        .only('pk', 'category_id', 'brand', 'is_featured', 'created_at')[:MAX_CANDIDATES]
+    )
+
+
+def score_related(product, limit=None):
+    """Return ``[(candidate_id, score)]`` for ``product``, best first"""
+    if limit is None:
+        limit = getattr(settings, 'RELATED_PRODUCTS_LIMIT', 4)
+    candidates = candidate_products(product)
+    scores = {}
+    for ranker, weight in get_rankers():
+        for pk, score in ranker(product, candidates).items():
+            scores[pk] = scores.get(pk, 0.0) + weight * score
+    # Ties keep the candidates' newest-first order
+    position = {candidate.pk: index for index, candidate in enumerate(candidates)}
+    ranked = sorted(
+        (pk for pk in scores if scores[pk] > 0 and pk in position),
+        key=lambda pk: (-scores[pk], position[pk]),
+    )
+    return [(pk, scores[pk]) for pk in ranked[:limit]]
+
+
+def empty_key(product):
+    return f'store:related-empty:{product.pk}'
+
+
+def empty_timeout():
+    return getattr(settings, 'RELATED_PRODUCTS_EMPTY_TIMEOUT', 3600)
+
+
+def related_rows(product):
+    return [
+        RelatedProduct(product=product, related_id=pk, score=score, rank=rank)
+        for rank, (pk, score) in enumerate(score_related(product))
+    ]
+
+
+def store_related(products, rows):
+    """Replace the related rows of ``products`` with ``rows``"""
+    with transaction.atomic():
+        RelatedProduct.objects.filter(product__in=products).delete()
+        RelatedProduct.objects.bulk_create(rows)
+    linked = {row.product_id for row in rows}
+    cache.delete_many([empty_key(product) for product in products if product.pk in linked])
+    cache.set_many({empty_key(product): True for product in products if product.pk not in linked}, empty_timeout())
+
+
+def refresh_related(products):
+    """Recompute the related rows of ``products``"""
+    products = [product for product in products if product is not None]
+    if not products:
+        return
+    rows = []
+    for product in products:
+        rows.extend(related_rows(product))
+    store_related(products, rows)
+
+
+def fill_related(product):
+    """
+    First-use fill for a product without related rows.
+
+    Only writes if something related was found; otherwise the product is
+    just marked empty. Returns whether rows were stored.
+    """
+    rows = related_rows(product)
+    if rows:
+        store_related([product], rows)
+    else:
+        cache.set(empty_key(product), True, empty_timeout())
+    return bool(rows)
+
+
+def refresh_around(product, created=False):
+    """
+    Refresh ``product`` and the products whose lists it may appear in.
+
+    That is every product currently linking to it and, for new products, the
+    newest products in its category. Anything further out catches up on the
+    next ``rebuild_related_products`` run.
+    """
+    affected = set(RelatedProduct.objects.filter(related=product).values_list('product_id', flat=True))
+    if created and product.category_id:
+        affected.update(
+            Product.objects.filter(category_id=product.category_id)
+            .exclude(pk=product.pk).values_list('pk', flat=True)[:PEERS_REFRESHED]
+        )
+    refresh_related([product] + list(Product.objects.filter(pk__in=affected)))
+
+
+def refresh_related_ids(product_ids, batch_size=200):
+    """Recompute the related rows of the products with ``product_ids``"""
+    product_ids = sorted(product_ids)
+    for start in range(0, len(product_ids), batch_size):
+        refresh_related(list(Product.objects.filter(pk__in=product_ids[start:start + batch_size])))
+
+
+def rebuild_related(batch_size=200):
+    """Recompute related products for the whole catalog"""
+    total = 0
+    batch = []
+    for product in Product.objects.order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            refresh_related(batch)
+            total += len(batch)
+            batch = []
+    refresh_related(batch)
+    return total + len(batch)
+
+
+def get_related_products(product):
+    """Precomputed related products for the detail page, filled on first use"""
+    links = list(product.related_links.select_related('related__category'))
+    if not links and not cache.get(empty_key(product)) and fill_related(product):
+        links = list(product.related_links.select_related('related__category'))
+    return [link.related for link in links]
+
+
+async def aget_related_products(product):
+    """Async ``get_related_products``"""
+    links = product.related_links.select_related('related__category')
+    related = [link.related async for link in links]
+    if not related and not await cache.aget(empty_key(product)) and await sync_to_async(fill_related)(product):
+        related = [link.related async for link in links.all()]
+    return related
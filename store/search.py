@@ -0,0 +1,197 @@
+"""
+Product search backends.
+
+``product_list`` delegates free-text queries to the backend named by the
+``STORE_SEARCH_BACKEND`` setting. When it is unset, SQLite databases with
+FTS5 support use :class:`SQLiteFTS5Backend`, PostgreSQL uses
+:class:`PostgresSearchBackend` and anything else falls back to the original
+``icontains`` scan.
+"""
+import re
+import sqlite3
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split a raw search string into lowercase word tokens"""
+    return [token.lower() for token in TOKEN_RE.findall(query or '')]
+
+
+class BaseSearchBackend:
+    """Interface every search backend implements"""
+
+    def search(self, queryset, query):
+        """Filter ``queryset`` to products matching ``query``, best match first"""
+        raise NotImplementedError
+
+    def index(self, products):
+        """Add or refresh ``products`` in the index"""
+
+    def remove(self, product_ids):
+        """Drop ``product_ids`` from the index"""
+
+    def rebuild(self):
+        """Re-index the whole catalog, returning the number of products indexed"""
+        return 0
+
+
+class IContainsBackend(BaseSearchBackend):
+    """Unindexed substring match across the text columns"""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(short_description__icontains=query) |
+            Q(brand__icontains=query)
+        )
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    SQLite FTS5 index kept in the ``store_product_fts`` virtual table.
+
+    Rows share their rowid with ``store_product.id``. Every query token is
+    prefix-matched and results are ordered by BM25 with matches in the name
+    and brand weighted above matches in the long description.
+    """
+    table = 'store_product_fts'
+    columns = ('name', 'brand', 'short_description', 'description')
+    weights = (10.0, 6.0, 4.0, 1.0)
+    batch_size = 500
+
+    @staticmethod
+    def match_expression(query):
+        return ' '.join('"%s"*' % token.replace('"', '""') for token in tokenize(query))
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        rank = 'bm25(%s, %s)' % (self.table, ', '.join(str(w) for w in self.weights))
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                '%s.rowid = store_product.id' % self.table,
+                '%s MATCH %%s' % self.table,
+            ],
+            params=[expression],
+            select={'search_rank': rank},
+            order_by=['search_rank', '-created_at'],
+        )
+
+    def index(self, products):
+        products = list(products)
+        if not products:
+            return
+        self.remove([product.pk for product in products])
+        placeholders = ', '.join(['%s'] * (len(self.columns) + 1))
+        sql = 'INSERT INTO %s (rowid, %s) VALUES (%s)' % (
+            self.table, ', '.join(self.columns), placeholders
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                [product.pk] + [getattr(product, column) or '' for column in self.columns]
+                for product in products
+            ])
+
+    def remove(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            for start in range(0, len(product_ids), self.batch_size):
+                chunk = product_ids[start:start + self.batch_size]
+                cursor.execute(
+                    'DELETE FROM %s WHERE rowid IN (%s)' % (self.table, ', '.join(['%s'] * len(chunk))),
+                    chunk,
+                )
+
+    def rebuild(self):
+        from .models import Product
+
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % self.table)
+        total = 0
+        batch = []
+        products = Product.objects.only('pk', *self.columns).order_by('pk')
+        for product in products.iterator(chunk_size=self.batch_size):
+            batch.append(product)
+            if len(batch) >= self.batch_size:
+                self.index(batch)
+                total += len(batch)
+                batch = []
+        self.index(batch)
+        total += len(batch)
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO %s (%s) VALUES ('optimize')" % (self.table, self.table))
+        return total
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL full-text search over a weighted ``tsvector``.
+
+    The vector is computed in the query and matched by the expression GIN
+    index migration 0015 builds from ``search_vector``, so there is no side
+    table to maintain. Change both together or the index stops being used.
+    """
+    config = 'english'
+    index_name = 'product_search_gin'
+
+    @classmethod
+    def search_vector(cls):
+        from django.contrib.postgres.search import SearchVector
+
+        return (
+            SearchVector('name', weight='A', config=cls.config) +
+            SearchVector('brand', weight='A', config=cls.config) +
+            SearchVector('short_description', weight='B', config=cls.config) +
+            SearchVector('description', weight='C', config=cls.config)
+        )
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        vector = self.search_vector()
+        search_query = SearchQuery(
+            ' & '.join('%s:*' % token for token in tokens),
+            search_type='raw',
+            config=self.config,
+        )
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=SearchRank(vector, search_query),
+        ).filter(search_vector=search_query).order_by('-search_rank', '-created_at')
+
+
+def fts5_available():
+    """Whether the SQLite library Python links against was built with FTS5"""
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(body)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """Return the configured search backend instance"""
+    path = getattr(settings, 'STORE_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite' and fts5_available():
+        return SQLiteFTS5Backend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return IContainsBackend()
@@ -0,0 +1,99 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .cart import merge_anonymous_cart
+from .images import needs_variants, schedule_variants
+from .metrics import install_query_recorder
+from .models import Category, Product, RelatedProduct
+from .related import refresh_around, refresh_related
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    """
+    Keep the search index in sync with saved products.
+
+    Raw saves (``loaddata``) are indexed too: indexing only reads the
+    instance's own columns.
+    """
+    get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    """Drop deleted products from the search index"""
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Drop cached featured lists and rendered fragments on any catalog change"""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_products(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Bump ``updated_at`` on a renamed or deleted category's products.
+
+    API ETags are derived from ``Product.updated_at`` and the responses
+    include the category, so its products count as changed too.
+    """
+    if created or raw:
+        return
+    Product.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Product)
+def refresh_related_products(sender, instance, created=False, raw=False, **kwargs):
+    """Recompute related products around a saved product"""
+    if raw:
+        return
+    refresh_around(instance, created=created)
+
+
+@receiver(pre_delete, sender=Product)
+def collect_related_referrers(sender, instance, **kwargs):
+    # The links to a deleted product cascade away; remember who had them
+    instance._related_referrers = list(
+        RelatedProduct.objects.filter(related=instance).values_list('product_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Product)
+def refill_related_referrers(sender, instance, **kwargs):
+    """Backfill the lists that lost a deleted product"""
+    referrers = getattr(instance, '_related_referrers', [])
+    if referrers:
+        refresh_related(Product.objects.filter(pk__in=referrers))
+
+
+@receiver(post_save, sender=Product)
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    """Render responsive image variants once the save is committed"""
+    if raw or not needs_variants(instance):
+        return
+    transaction.on_commit(lambda: schedule_variants(instance))
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    """Carry the cart a visitor built before logging in over to their account"""
+    if request is not None:
+        merge_anonymous_cart(request)
+
+
+@receiver(connection_created)
+def record_queries(sender, connection, **kwargs):
+    """Count every connection's queries towards the request using it"""
+    install_query_recorder(connection)
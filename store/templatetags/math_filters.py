@@ -1,5 +1,9 @@
+from decimal import InvalidOperation
+
 from django import template
 
+from store.pricing import to_money
+
 register = template.Library()
 
 @register.filter
@@ -46,6 +50,6 @@ def round_filter(value, arg=2):
 def format_currency(value):
     """Format value as currency"""
     try:
-        return f"${float(value):,.2f}"
-    except (ValueError, TypeError):
+        return f"${to_money(value):,.2f}"
+    except (ValueError, TypeError, InvalidOperation):
         return f"${value}"
\ No newline at end of file
@@ -0,0 +1,38 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w'
+        for width, name in sorted(variants.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def product_image(product, sizes='100vw', alt=None, style='', loading='lazy'):
+    """
+    Responsive <picture> for a product image.
+
+    Serves WebP with a JPEG fallback and lets the browser pick the smallest
+    variant for ``sizes``; falls back to the original upload until variants
+    have been generated.
+    """
+    alt = product.name if alt is None else alt
+    variants = product.image_variants or {}
+    if not variants.get('jpeg'):
+        return format_html(
+            '<img src="{}" alt="{}" style="{}" loading="{}">',
+            product.image.url, alt, style, loading,
+        )
+    jpeg = variants['jpeg']
+    smallest = jpeg[min(jpeg, key=int)]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" style="{}" loading="{}"></picture>',
+        _srcset(variants.get('webp', {})), sizes,
+        default_storage.url(smallest), _srcset(jpeg), sizes, alt, style, loading,
+    )
@@ -0,0 +1,137 @@
+"""
+Query budgets and N+1 detection for tests.
+
+``query_budget`` records the SQL run inside it and fails the test when
+
+* more than ``max_queries`` statements ran, or
+* one statement ran ``n_plus_one`` times or more with only its parameters
+  changing, the signature of a query issued once per row in a loop.
+
+Statements are compared before parameters are interpolated, so
+``SELECT ... WHERE id = %s`` run for ids 1, 2 and 3 counts as one statement
+repeated three times. It works as a context manager or a decorator::
+
+    with query_budget(4):
+        client.get('/cart/')
+
+    @query_budget(2, n_plus_one=None)
+    def test_badge(self): ...
+
+pytest tests get it as the ``query_budget`` fixture from ``conftest.py``.
+"""
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+from pathlib import Path
+
+import django.db
+from django.db import connections
+
+# Statements that legitimately repeat within a request
+DEFAULT_IGNORE = (
+    r'^(RELEASE )?SAVEPOINT ',
+    r'^ROLLBACK TO SAVEPOINT ',
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+THIS_FILE = Path(__file__).resolve()
+DJANGO_DB = Path(django.db.__file__).resolve().parent
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RecordedQuery:
+    def __init__(self, alias, sql, params, origin):
+        self.alias = alias
+        self.sql = sql
+        self.params = params
+        self.origin = origin
+
+
+def query_origin():
+    """
+    The project line that issued the current query, as ``file:line``.
+
+    That is the innermost project frame before the stack enters
+    ``django.db``; frames below it are execute wrappers, ours included.
+    """
+    origin = '?'
+    for frame in traceback.extract_stack():
+        path = Path(frame.filename)
+        if DJANGO_DB in path.parents:
+            break
+        if PROJECT_ROOT in path.parents and path != THIS_FILE:
+            origin = f'{path.relative_to(PROJECT_ROOT)}:{frame.lineno}'
+    return origin
+
+
+class QueryBudget:
+    """Context manager and decorator enforcing a query budget"""
+
+    def __init__(self, max_queries=None, n_plus_one=3, using=None, ignore=DEFAULT_IGNORE):
+        self.max_queries = max_queries
+        self.n_plus_one = n_plus_one
+        self.using = using
+        self.ignore = [re.compile(pattern) for pattern in ignore]
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self.queries = []
+        self._stack = ExitStack()
+        aliases = [self.using] if self.using else list(connections)
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self._recorder(alias)))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        if exc_type is None:
+            self.check()
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with QueryBudget(self.max_queries, self.n_plus_one, self.using, [p.pattern for p in self.ignore]):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def _recorder(self, alias):
+        def record(execute, sql, params, many, context):
+            self.queries.append(RecordedQuery(alias, sql, params, query_origin()))
+            return execute(sql, params, many, context)
+        return record
+
+    def repeated(self):
+        """``[(sql, count, origins)]`` for statements that look like N+1"""
+        if not self.n_plus_one:
+            return []
+        counts = Counter(
+            (query.alias, query.sql) for query in self.queries
+            if not any(pattern.search(query.sql) for pattern in self.ignore)
+        )
+        return [
+            (sql, count, sorted({query.origin for query in self.queries if (query.alias, query.sql) == (alias, sql)}))
+            for (alias, sql), count in counts.most_common()
+            if count >= self.n_plus_one
+        ]
+
+    def check(self):
+        problems = []
+        if self.max_queries is not None and len(self.queries) > self.max_queries:
+            problems.append(f'{len(self.queries)} queries, budget is {self.max_queries}')
+        for sql, count, origins in self.repeated():
+            problems.append(f'N+1: ran {count} times from {", ".join(origins)}: {sql}')
+        if problems:
+            listing = '\n'.join(f'{index}. {query.sql} {query.params!r}' for index, query in enumerate(self.queries, 1))
+            raise QueryBudgetExceeded('\n'.join(problems) + '\n\nQueries:\n' + listing)
+
+
+def query_budget(max_queries=None, n_plus_one=3, using=None, ignore=DEFAULT_IGNORE):
+    """Fail when the wrapped code exceeds ``max_queries`` or shows an N+1"""
+    return QueryBudget(max_queries, n_plus_one, using, ignore)
+
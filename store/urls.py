@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, metrics, views
 
 urlpatterns = [
     # Home
@@ -19,6 +19,16 @@ urlpatterns = [
     # Checkout
     path('checkout/', views.checkout, name='checkout'),
     path('order/<int:order_id>/', views.order_confirmation, name='order_confirmation'),
+    path('orders/', views.order_history, name='order_history'),
+    
+    # JSON API
+    path('api/products/', api.product_list, name='api_product_list'),
+    path('api/products/batch/', api.product_batch, name='api_product_batch'),
+    path('api/products/<int:pk>/', api.product_detail, name='api_product_detail'),
+    path('api/categories/', api.category_list, name='api_category_list'),
+    
+    # Monitoring
+    path('metrics', metrics.metrics, name='metrics'),
     
     # Authentication
     path('accounts/login/', views.user_login, name='login'),
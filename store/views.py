@@ -1,19 +1,25 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from django.db.models import Q
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
-from django.core.mail import send_mail
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.text import slugify
 from django.utils import timezone
 from django.conf import settings
-from .models import Product, Order, OrderItem, Category
+from django.db.models import Count
+from .models import Product, Order, Category
+from .caching import catalog_version, get_featured_products
+from .catalog import filter_products, listing_filters
+from .cart import aget_cart_storage, aget_cart_summary, attach_cart, get_cart_storage
+from .checkout import InsufficientStock, place_order
+from .httpcache import cache_policy
+from .related import aget_related_products
+from .pricing import quote, quote_order, to_money
+from .pagination import CachedCountPaginator, InvalidCursor, KeysetPage, KeysetPaginator
 import json
 import logging
 
@@ -21,91 +27,93 @@ logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+async def arender(request, template_name, context):
+    """
+    ``render`` for async views.
+
+    Templates read the user and the cart badge lazily; both are loaded here
+    without blocking, so rendering never touches the database.
+    """
+    request.user = await request.auser()
+    await aget_cart_summary(request)
+    return render(request, template_name, context)
+
+@cache_policy()
 def home(request):
     """Home page view"""
-    # Get featured products
-    featured_products = Product.objects.filter(is_featured=True).select_related('category')[:8]
-    if not featured_products.exists():
-        featured_products = Product.objects.all().select_related('category')[:8]
-    
+    # Featured products are cached per catalog version; passing the callable
+    # means the cache isn't even consulted when the rendered grid is cached
     context = {
-        'products': featured_products,
+        'products': get_featured_products,
+        'catalog_version': catalog_version(),
+        'catalog_cache_timeout': getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300),
     }
     return render(request, 'store/home.html', context)
 def clear_cart(request):
     """
     Clear all items from the user's cart
     """
-    if request.user.is_authenticated:
-        # Clear cart for authenticated user
-        Cart.objects.filter(user=request.user).delete()
-        messages.success(request, 'Your cart has been cleared!')
-    else:
-        # Clear cart from session for anonymous user
-        request.session['cart'] = {}
-        messages.success(request, 'Your cart has been cleared!')
+    # Signed cookie for anonymous visitors, Cart rows for logged-in users
+    get_cart_storage(request).clear()
+    attach_cart(request)
+    messages.success(request, 'Your cart has been cleared!')
     
-    return redirect('store:cart')
+    return redirect('cart_detail')
 
-def product_list(request):
+@cache_policy()
+async def product_list(request):
     """Product list view with pagination and filtering"""
-    products = Product.objects.all().select_related('category')
-    query = request.GET.get('q')
-    category_slug = request.GET.get('category')
+    filters = listing_filters(request.GET)
+    products = filter_products(Product.objects.all().select_related('category'), **filters)
+    query = filters['query']
     page = request.GET.get('page', 1)
-    verified_only = request.GET.get('verified', '0') == '1'
-    in_stock = request.GET.get('stock', '0') == '1'
-    
-    if query:
-        products = products.filter(
-            Q(name__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(short_description__icontains=query) |
-            Q(brand__icontains=query)
-        )
+    cursor = request.GET.get('cursor')
     
-    if category_slug and category_slug != 'all':
-        products = products.filter(category__slug=category_slug)
-    
-    if verified_only:
-        products = products.filter(is_verified=True)
-    
-    if in_stock:
-        products = products.filter(stock__gt=0)
+    # Pagination: page numbers for shallow pages, opt-in keyset cursors for
+    # deep ones. Search results are ranked, so they always use page numbers.
+    next_cursor = None
+    if cursor and not query:
+        paginator = KeysetPaginator(products, 12)
+        try:
+            page_obj = await paginator.apage(cursor)
+        except InvalidCursor:
+            page_obj = await paginator.apage()
+    else:
+        paginator = CachedCountPaginator(products, 12)
+        page_obj = await paginator.aget_page(page)
+        cursor_after = getattr(settings, 'PRODUCT_LIST_CURSOR_AFTER_PAGE', 5)
+        if not query and page_obj.has_next() and page_obj.number >= cursor_after:
+            next_cursor = KeysetPaginator.encode_cursor(page_obj.object_list[-1], 'next')
     
-    # Pagination
-    paginator = Paginator(products, 12)
-    page_obj = paginator.get_page(page)
+    filter_params = request.GET.copy()
+    filter_params.pop('page', None)
+    filter_params.pop('cursor', None)
     
-    # Get all categories for filter
-    categories = Category.objects.all()
+    # Get all categories for filter, counted in the same query
+    categories = [
+        category async for category in Category.objects.annotate(product_count=Count('product'))
+    ]
     
     context = {
         'products': page_obj,
         'categories': categories,
         'query': query,
-        'selected_category': category_slug,
-        'verified_only': verified_only,
-        'in_stock': in_stock,
+        'selected_category': filters['category'],
+        'verified_only': filters['verified_only'],
+        'in_stock': filters['in_stock'],
+        'cursor_mode': isinstance(page_obj, KeysetPage),
+        'next_cursor': next_cursor,
+        'filter_query': filter_params.urlencode(),
     }
-    return render(request, 'store/product_list.html', context)
+    return await arender(request, 'store/product_list.html', context)
 
-def product_detail(request, pk):
+@cache_policy()
+async def product_detail(request, pk):
     """Product detail view"""
-    product = get_object_or_404(Product, pk=pk)
-    
-    # Get related products (same category, exclude current)
-    related_products = Product.objects.filter(
-        category=product.category,
-        pk__ne=pk,
-        is_featured=True
-    ).select_related('category')[:4]
+    product = await aget_object_or_404(Product.objects.select_related('category'), pk=pk)
     
-    if not related_products.exists():
-        related_products = Product.objects.filter(
-            category=product.category,
-            pk__ne=pk
-        ).select_related('category')[:4]
+    # Precomputed related products, one indexed lookup
+    related_products = await aget_related_products(product)
     
     # Calculate average rating (placeholder)
     average_rating = 4.8
@@ -115,15 +123,12 @@ def product_detail(request, pk):
         'related_products': related_products,
         'average_rating': average_rating,
     }
-    return render(request, 'store/product_detail.html', context)
+    return await arender(request, 'store/product_detail.html', context)
 
 @require_http_methods(["GET", "POST"])
-def add_to_cart(request, product_id):
+async def add_to_cart(request, product_id):
     """Add product to cart"""
-    if not request.session.session_key:
-        request.session.create()
-    
-    product = get_object_or_404(Product, id=product_id)
+    product = await aget_object_or_404(Product, id=product_id)
     quantity = int(request.GET.get('quantity', request.POST.get('quantity', 1)))
     
     # Check stock
@@ -136,11 +141,11 @@ def add_to_cart(request, product_id):
         messages.error(request, f'Only {product.stock} items available in stock')
         return redirect('product_detail', pk=product_id)
     
-    cart = request.session.get('cart', {})
-    product_id_str = str(product_id)
+    cart = await aget_cart_storage(request)
+    await cart.aitems()
     
-    if product_id_str in cart:
-        new_quantity = cart[product_id_str] + quantity
+    if product_id in cart:
+        new_quantity = cart.quantity(product_id) + quantity
         if new_quantity > product.stock:
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({
@@ -149,21 +154,19 @@ def add_to_cart(request, product_id):
                 })
             messages.error(request, f'Cannot add more than {product.stock} items')
             return redirect('product_detail', pk=product_id)
-        cart[product_id_str] = new_quantity
-    else:
-        cart[product_id_str] = quantity
     
-    request.session['cart'] = cart
-    request.session.modified = True
+    # Incrementally updates the cached summary used by the header badge
+    await cart.aadd(product, quantity)
+    attach_cart(request)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
             'status': 'success',
             'message': f'Added {quantity} x {product.name} to cart',
-            'cart_count': sum(cart.values()),
-            'cart_items': len(cart),
+            'cart_count': cart.count,
+            'cart_items': cart.line_count,
             'product_name': product.name,
-            'total_price': float(product.price) * quantity
+            'total_price': float(to_money(product.price) * quantity)
         })
     
     messages.success(request, f'Added {quantity} x {product.name} to cart!')
@@ -171,86 +174,70 @@ def add_to_cart(request, product_id):
 
 def cart_detail(request):
     """Cart detail view"""
-    cart = request.session.get('cart', {})
-    products = []
-    total = 0
-    tax_rate = 0.08  # 8% tax
-    
-    for product_id, quantity in list(cart.items()):
-        try:
-            product = Product.objects.get(id=product_id)
-            if quantity > product.stock:
-                # Adjust quantity to available stock
-                cart[str(product_id)] = product.stock
-                quantity = product.stock
-                request.session['cart'] = cart
-                request.session.modified = True
-                messages.warning(request, f'Quantity for {product.name} adjusted to available stock: {quantity}')
-            
-            subtotal = float(product.price) * quantity
-            total += subtotal
-            products.append({
-                'product': product,
-                'quantity': quantity,
-                'subtotal': round(subtotal, 2),
-                'unit_price': float(product.price)
-            })
-        except Product.DoesNotExist:
-            # Remove invalid product from cart
-            if str(product_id) in cart:
-                del cart[str(product_id)]
-            request.session['cart'] = cart
-            request.session.modified = True
-            messages.warning(request, 'Some items were removed from your cart')
-    
-    # Calculate tax and final total
-    tax_amount = round(total * tax_rate, 2)
-    final_total = round(total + tax_amount, 2)
+    hydrated = request.cart
+    for line in hydrated.adjusted:
+        messages.warning(request, f'Quantity for {line.product.name} adjusted to available stock: {line.quantity}')
+    for product in hydrated.sold_out:
+        messages.warning(request, f'{product.name} is out of stock and was removed from your cart')
+    if hydrated.removed:
+        messages.warning(request, 'Some items were removed from your cart')
+    
+    # Price the whole cart once; the template only formats these values
+    cart_quote = quote((line.product, line.quantity) for line in hydrated.lines)
+    products = [
+        {
+            'product': line.product,
+            'quantity': line.quantity,
+            'subtotal': line.total,
+            'unit_price': line.unit_price
+        }
+        for line in cart_quote.lines
+    ]
     
     context = {
         'products': products,
-        'total': round(total, 2),
-        'tax_amount': tax_amount,
-        'final_total': final_total,
-        'tax_rate': tax_rate,
-        'cart_count': len(products),
-        'cart_items': sum(cart.values()) if cart else 0
+        'total': cart_quote.subtotal,
+        'tax_amount': cart_quote.tax,
+        'final_total': cart_quote.total,
+        'tax_rate': cart_quote.tax_rate,
+        'tax_rate_percent': cart_quote.tax_rate_percent,
+        'cart_count': hydrated.line_count,
+        'cart_items': hydrated.count
     }
     return render(request, 'store/cart.html', context)
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def update_cart_quantity(request, product_id):
+async def update_cart_quantity(request, product_id):
     """Update cart item quantity via AJAX"""
     if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
         return JsonResponse({'status': 'error', 'message': 'AJAX request required'}, status=400)
     
-    cart = request.session.get('cart', {})
+    cart = await aget_cart_storage(request)
     quantity = int(request.POST.get('quantity', 1))
-    product_id_str = str(product_id)
     
     try:
-        product = Product.objects.get(id=product_id)
+        product = await Product.objects.aget(id=product_id)
         if quantity > product.stock:
             quantity = product.stock
             messages.warning(request, f'Quantity adjusted to available stock: {quantity}')
         
+        await cart.aitems()
         if quantity <= 0:
-            if product_id_str in cart:
-                del cart[product_id_str]
+            if product_id in cart:
+                await cart.aremove(product_id, product)
                 messages.success(request, f'{product.name} removed from cart')
         else:
-            cart[product_id_str] = quantity
+            await cart.aset(product, quantity)
             messages.success(request, f'Updated quantity to {quantity}')
         
-        request.session['cart'] = cart
-        request.session.modified = True
+        attach_cart(request)
         
         return JsonResponse({
             'status': 'success',
             'quantity': quantity,
-            'cart_count': sum(cart.values()),
-            'cart_items': len([q for q in cart.values() if q > 0]),
+            'cart_count': cart.count,
+            'cart_items': cart.line_count,
             'message': f'Cart updated successfully'
         })
     except Product.DoesNotExist:
@@ -261,21 +248,17 @@ def update_cart_quantity(request, product_id):
 
 def remove_from_cart(request, item_id):
     """Remove item from cart"""
-    cart = request.session.get('cart', {})
-    product_id_str = str(item_id)
+    cart = get_cart_storage(request)
     
-    if product_id_str in cart:
+    if item_id in cart:
         try:
             product = Product.objects.get(id=item_id)
-            del cart[product_id_str]
-            request.session['cart'] = cart
-            request.session.modified = True
+            cart.remove(item_id, product)
             messages.success(request, f'{product.name} removed from cart')
         except Product.DoesNotExist:
-            del cart[product_id_str]
-            request.session['cart'] = cart
-            request.session.modified = True
+            cart.remove(item_id)
             messages.success(request, 'Item removed from cart')
+        attach_cart(request)
     else:
         messages.warning(request, 'Item not found in cart')
     
@@ -287,67 +270,41 @@ def checkout(request):
         messages.error(request, 'Please login to checkout')
         return redirect(f'{settings.LOGIN_URL}?next={request.path}')
     
-    cart = request.session.get('cart', {})
+    cart = get_cart_storage(request)
     if not cart:
         messages.error(request, 'Your cart is empty')
         return redirect('product_list')
     
     # Validate stock before creating order
+    hydrated = request.cart
     valid_items = []
-    total = 0
     
-    for product_id, quantity in list(cart.items()):
-        try:
-            product = Product.objects.get(id=product_id)
-            if quantity <= product.stock:
-                price = float(product.price) * quantity
-                valid_items.append((product, quantity, price))
-                total += price
-            else:
-                # Remove out-of-stock items
-                del cart[product_id]
-                messages.warning(request, f'{product.name} removed - insufficient stock')
-        except Product.DoesNotExist:
-            del cart[product_id]
+    for line in hydrated.lines:
+        if line.adjusted:
+            # Remove out-of-stock items
+            messages.warning(request, f'{line.product.name} removed - insufficient stock')
             continue
+        valid_items.append((line.product, line.quantity))
+    for product in hydrated.sold_out:
+        messages.warning(request, f'{product.name} removed - insufficient stock')
     
     if not valid_items:
-        request.session['cart'] = {}
-        request.session.modified = True
+        cart.clear()
         messages.error(request, 'All items in cart are out of stock')
         return redirect('product_list')
     
-    # Create order
-    order = Order.objects.create(
-        user=request.user,
-        total_price=round(total, 2),
-        status='confirmed'
-    )
-    
-    # Create order items
-    for product, quantity, price in valid_items:
-        OrderItem.objects.create(
-            order=order,
-            product=product,
-            quantity=quantity,
-            price=round(price / quantity, 2)  # Store unit price
-        )
+    # Reserve stock and create the order atomically
+    try:
+        order = place_order(request.user, valid_items)
+    except InsufficientStock as e:
+        # Someone else bought the remaining units since the cart was validated
+        for product in e.products:
+            messages.warning(request, f'{product.name} just sold out - please review your cart')
+        return redirect('cart_detail')
+    total = order.grand_total
     
     # Clear cart
-    request.session['cart'] = {}
-    request.session.modified = True
-    
-    # Send confirmation email (optional)
-    try:
-        send_mail(
-            subject=f'Order #{order.id} Confirmation - YourStore',
-            message=f'Thank you for your order! Your order #{order.id} has been received and is being processed.',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[request.user.email],
-            fail_silently=True,
-        )
-    except Exception as e:
-        logger.error(f'Failed to send order confirmation email: {e}')
+    cart.clear()
     
     messages.success(request, f'Thank you! Order #{order.id} placed successfully. Total: ${total:.2f}')
     return redirect('order_confirmation', order_id=order.id)
@@ -358,19 +315,38 @@ def order_confirmation(request, order_id):
         return redirect(f'{settings.LOGIN_URL}?next={request.path}')
     
     order = get_object_or_404(Order, id=order_id, user=request.user)
-    tax_rate = 0.08
-    tax_amount = round(float(order.total_price) * tax_rate, 2)
-    final_total = round(float(order.total_price) + tax_amount, 2)
     
+    order_items = list(order.items.select_related('product__category'))
+    
+    # Totals were stored on the order at checkout; the items only tell
+    # which tax rate (if a single one) applied
     context = {
         'order': order,
-        'order_items': order.items.select_related('product').all(),
-        'tax_amount': tax_amount,
-        'final_total': final_total,
-        'tax_rate': tax_rate
+        'order_items': order_items,
+        'subtotal': order.subtotal,
+        'tax_amount': order.tax_amount,
+        'final_total': order.grand_total,
+        'tax_rate_percent': quote_order(order, order_items).tax_rate_percent,
     }
     return render(request, 'store/order_confirmation.html', context)
 
+def order_history(request):
+    """Order history for the logged-in user"""
+    if not request.user.is_authenticated:
+        return redirect(f'{settings.LOGIN_URL}?next={request.path}')
+    
+    # Summary columns live on Order, so listing costs one query per page
+    paginator = KeysetPaginator(Order.objects.filter(user=request.user), 20)
+    try:
+        page_obj = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        page_obj = paginator.page()
+    
+    context = {
+        'orders': page_obj,
+    }
+    return render(request, 'store/order_history.html', context)
+
 def register(request):
     """User registration"""
     if request.user.is_authenticated:
@@ -0,0 +1,42 @@
+"""
+Worker start-up warmup.
+
+With the cached template loader every worker still parses each template the
+first time it is rendered, so the first requests after a deploy pay for it.
+``warm_up`` is called from ``mysite/wsgi.py`` and ``mysite/asgi.py`` once the
+application is loaded and, when ``WARM_TEMPLATES_ON_STARTUP`` is on, compiles
+every store template ahead of time.
+"""
+import logging
+import time
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates' / 'store'
+TEMPLATE_LIBRARIES = (
+    'store.templatetags.math_filters',
+    'store.templatetags.product_images',
+)
+
+
+def warm_templates():
+    """Compile every template under store/templates/store/ into the loader cache"""
+    names = sorted(f'store/{path.name}' for path in TEMPLATE_DIR.glob('*.html'))
+    for name in names:
+        get_template(name)
+    return names
+
+
+def warm_up():
+    if not getattr(settings, 'WARM_TEMPLATES_ON_STARTUP', False):
+        return
+    started = time.perf_counter()
+    for library in TEMPLATE_LIBRARIES:
+        import_module(library)
+    names = warm_templates()
+    logger.info(f'Compiled {len(names)} templates in {(time.perf_counter() - started) * 1000:.1f}ms')